@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """Bounded cache of generated answers, looked up by query-embedding cosine similarity
+
+    Entries are bucketed by (mode, language, key, dimension); a lookup returns
+    the stored answer of the most similar prior query in the same bucket when
+    its cosine similarity is at least `threshold`. `key` separates queries
+    that embed almost identically but must not share answers, such as the
+    templated /study queries for different chapters or verses.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 512, disabled_modes: Iterable[str] = ()):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.disabled_modes = {mode.strip() for mode in disabled_modes if mode.strip()}
+        self.version: Optional[str] = None
+        self._entries: "OrderedDict[int, dict]" = OrderedDict()
+        self._matrices = {}  # bucket -> (entry ids, stacked unit vectors), rebuilt lazily
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+    def enabled_for(self, mode: str) -> bool:
+        return self.max_entries > 0 and mode not in self.disabled_modes
+
+    @staticmethod
+    def _unit(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype='float32').ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding: np.ndarray, mode: str, language: str, key: str = "") -> Optional[dict]:
+        """Return {"response", "verses", "similarity"} for a close enough prior query"""
+        if not self.enabled_for(mode):
+            return None
+        query = self._unit(embedding)
+        bucket = (mode, language, key, query.shape[0])
+
+        with self._lock:
+            ids, matrix = self._bucket_matrix(bucket)
+            if not ids:
+                self.misses += 1
+                return None
+            similarities = matrix @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            entry = self._entries[ids[best]]
+            self._entries.move_to_end(ids[best])
+            self.hits += 1
+            self.saved_seconds += entry["latency"]
+            return {
+                "response": entry["response"],
+                "verses": list(entry["verses"]),
+                "similarity": float(similarities[best]),
+            }
+
+    def store(self, embedding: np.ndarray, mode: str, language: str, response: str, verses: List[str],
+              latency: float, key: str = ""):
+        if not self.enabled_for(mode):
+            return
+        vector = self._unit(embedding)
+        bucket = (mode, language, key, vector.shape[0])
+
+        with self._lock:
+            self._entries[self._next_id] = {
+                "bucket": bucket,
+                "vector": vector,
+                "response": response,
+                "verses": list(verses),
+                "latency": latency,
+                "created": time.time(),
+            }
+            self._next_id += 1
+            self._matrices.pop(bucket, None)
+
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._matrices.pop(evicted["bucket"], None)
+                self.evictions += 1
+
+    def _bucket_matrix(self, bucket):
+        if bucket not in self._matrices:
+            ids = [entry_id for entry_id, entry in self._entries.items() if entry["bucket"] == bucket]
+            matrix = np.stack([self._entries[i]["vector"] for i in ids]) if ids else None
+            self._matrices[bucket] = (ids, matrix)
+        return self._matrices[bucket]
+
+    def set_version(self, version: Optional[str]):
+        """Drop all answers when the underlying index changes"""
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self._matrices.clear()
+                self.version = version
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "saved_latency_seconds": round(self.saved_seconds, 3),
+            "disabled_modes": sorted(self.disabled_modes),
+        }
@@ -0,0 +1,77 @@
+import asyncio
+from typing import Awaitable, Callable, List, Tuple
+
+import numpy as np
+
+
+class QueryBatcher:
+    """Coalesces concurrent queries into one batched encode and one index search
+
+    Queries arriving within `window_ms` of the first pending one (or until
+    `max_batch` are queued) are embedded together, searched with a single
+    `index.search` over the stacked matrix, and the per-query rows are handed
+    back to the awaiting callers together with their embedding.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], Awaitable[np.ndarray]],
+        search_batch: Callable[[np.ndarray, int], Awaitable[Tuple[np.ndarray, np.ndarray]]],
+        window_ms: float = 5.0,
+        max_batch: int = 32
+    ):
+        self.embed_batch = embed_batch
+        self.search_batch = search_batch
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._pending: List[Tuple[str, int, asyncio.Future]] = []
+        self._timer = None
+        # The loop only keeps weak references to tasks; hold in-flight batches here
+        self._tasks = set()
+        self.batches = 0
+        self.queries = 0
+
+    async def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Queue a query and wait for its (embedding, distances, indices) rows"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query, k, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, int, asyncio.Future]]):
+        # Identical queries in one window share a single row
+        unique_texts = list(dict.fromkeys(query for query, _, _ in batch))
+        rows = {text: i for i, text in enumerate(unique_texts)}
+        k = max(k for _, k, _ in batch)
+
+        try:
+            embeddings = np.asarray(await self.embed_batch(unique_texts), dtype='float32')
+            distances, indices = await self.search_batch(embeddings, k)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.queries += len(batch)
+        for query, query_k, future in batch:
+            if not future.done():
+                row = rows[query]
+                future.set_result((embeddings[row], distances[row, :query_k], indices[row, :query_k]))
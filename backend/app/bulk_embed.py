@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import random
+import shutil
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from chunking import approximate_tokens
+
+# OpenAI accepts up to 2048 inputs and 300k tokens per embeddings request
+MAX_BATCH_SIZE = 2048
+MAX_BATCH_TOKENS = 100_000
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class EmbeddingModelMismatch(RuntimeError):
+    """Vectors from a different model (or dimension) than the index they are meant for"""
+
+
+def _replace_atomic(path: Path, write: Callable):
+    """write(file) to a temp file unique to this call, then rename it over path
+
+    Several workers may build the same job at once; each writes its own temp
+    file, and the last rename wins with identical contents.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, server errors and connection/timeout failures (which carry no status)"""
+    status = _status_code(error)
+    if status is None:
+        return type(error).__name__ in ("APIConnectionError", "APITimeoutError", "TimeoutError", "ConnectionError")
+    return status in RETRY_STATUSES
+
+
+class BulkEmbedder:
+    """Embeds large text lists in token-bounded batches, concurrently and resumably
+
+    Batches are contiguous ranges of at most `max_batch_size` inputs and
+    `max_batch_tokens` tokens, run on up to `concurrency` threads. Failed
+    requests are retried on 429/5xx with exponential backoff, honouring
+    Retry-After. With a checkpoint directory every finished batch is saved,
+    so a crashed build resumes with the batches it still lacks; the job id
+    covers the model and the exact texts. `embed_batch` must raise on
+    failure rather than fall back to another model, and every batch must
+    come back with the same dimension, so one index never mixes models.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], np.ndarray],
+        model_id: str,
+        count_tokens: Callable[[str], int] = approximate_tokens,
+        max_batch_tokens: int = MAX_BATCH_TOKENS,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        concurrency: int = 4,
+        max_retries: int = 6,
+        backoff_seconds: float = 1.0,
+        max_backoff_seconds: float = 60.0,
+        checkpoint_dir: Optional[str] = None,
+    ):
+        self.embed_batch = embed_batch
+        self.model_id = model_id
+        self.count_tokens = count_tokens
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.checkpoint_dir = Path(checkpoint_dir) if checkpoint_dir else None
+        self.retries = 0
+        # Called as on_progress(batches_done, batches_total) after every batch
+        self.on_progress: Optional[Callable[[int, int], None]] = None
+        self._lock = threading.Lock()
+
+    def plan(self, texts: List[str]) -> List[Tuple[int, int]]:
+        """[start, end) ranges that respect both batch limits"""
+        batches, start, tokens = [], 0, 0
+        for i, text in enumerate(texts):
+            text_tokens = self.count_tokens(text)
+            if i > start and (tokens + text_tokens > self.max_batch_tokens or i - start >= self.max_batch_size):
+                batches.append((start, i))
+                start, tokens = i, 0
+            tokens += text_tokens
+        if start < len(texts):
+            batches.append((start, len(texts)))
+        return batches
+
+    def job_id(self, texts: List[str]) -> str:
+        digest = hashlib.sha256(self.model_id.encode('utf-8'))
+        for text in texts:
+            digest.update(hashlib.sha256(text.encode('utf-8')).digest())
+        return digest.hexdigest()[:24]
+
+    def _call(self, texts: List[str]) -> np.ndarray:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return np.asarray(self.embed_batch(texts), dtype='float32')
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** attempt)
+                    delay *= random.uniform(0.5, 1.0)
+                with self._lock:
+                    self.retries += 1
+                print(f"Embedding batch failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _open_job(self, texts: List[str]) -> Optional[Path]:
+        if self.checkpoint_dir is None:
+            return None
+        job_dir = self.checkpoint_dir / self.job_id(texts)
+        manifest_path = job_dir / "job.json"
+        try:
+            job_dir.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            print(f"Embedding checkpoints disabled: {e}")
+            return None
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = None
+        if manifest is not None:
+            if manifest.get("model_id") != self.model_id:
+                raise EmbeddingModelMismatch(
+                    f"Checkpoint {job_dir} was written by {manifest.get('model_id')}, not {self.model_id}"
+                )
+        else:
+            manifest = json.dumps({"model_id": self.model_id, "total": len(texts)}).encode('utf-8')
+            try:
+                _replace_atomic(manifest_path, lambda f: f.write(manifest))
+            except OSError as e:
+                print(f"Embedding checkpoints disabled: {e}")
+                return None
+        return job_dir
+
+    @staticmethod
+    def _load_batch(path: Optional[Path]) -> Optional[np.ndarray]:
+        """A finished checkpoint batch, or None (also when another worker just removed the job)"""
+        if path is None:
+            return None
+        try:
+            return np.load(path)
+        except (OSError, ValueError):
+            return None
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), d) float32 embeddings in input order"""
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype='float32')
+        job_dir = self._open_job(texts)
+        results = {}
+        pending = []
+        for start, end in self.plan(texts):
+            path = job_dir / f"batch_{start:08d}_{end:08d}.npy" if job_dir else None
+            vectors = self._load_batch(path) if path is not None and path.exists() else None
+            if vectors is not None:
+                results[start] = vectors
+            else:
+                pending.append((start, end, path))
+        if job_dir and results:
+            print(f"Resuming embedding job {job_dir.name}: {len(results)} batches already done")
+        total = len(results) + len(pending)
+
+        def report():
+            if self.on_progress is not None:
+                self.on_progress(len(results), total)
+
+        def run(batch):
+            start, end, path = batch
+            # Another worker building the same job may have finished this batch meanwhile
+            vectors = self._load_batch(path) if path is not None and path.exists() else None
+            if vectors is not None and len(vectors) == end - start:
+                return start, vectors
+            vectors = self._call(texts[start:end])
+            if len(vectors) != end - start:
+                raise RuntimeError(f"Embedding batch {start}-{end} returned {len(vectors)} vectors")
+            if path is not None:
+                try:
+                    _replace_atomic(path, lambda f: np.save(f, vectors))
+                except OSError as e:
+                    # e.g. the job directory was removed by a worker that finished first
+                    print(f"Could not checkpoint embedding batch {start}-{end}: {e}")
+            return start, vectors
+
+        if self.concurrency == 1 or len(pending) <= 1:
+            for batch in pending:
+                start, vectors = run(batch)
+                results[start] = vectors
+                report()
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(pending)),
+                                    thread_name_prefix="bulk-embed") as pool:
+                for start, vectors in pool.map(run, pending):
+                    results[start] = vectors
+                    report()
+
+        dimensions = {vectors.shape[1] for vectors in results.values()}
+        if len(dimensions) != 1:
+            raise EmbeddingModelMismatch(f"Embedding batches disagree on dimension: {sorted(dimensions)}")
+        embeddings = np.vstack([results[start] for start in sorted(results)])
+        if job_dir is not None:
+            shutil.rmtree(job_dir, ignore_errors=True)
+        return embeddings
+
+
+def check_compatible(index, vectors: np.ndarray, index_model: Optional[str], model_id: str):
+    """Refuse to add vectors from another model or dimension to an existing index"""
+    if index_model is not None and index_model != model_id:
+        raise EmbeddingModelMismatch(f"Index was built with {index_model}, not {model_id}")
+    if index is not None and index.ntotal and vectors.shape[1] != index.d:
+        raise EmbeddingModelMismatch(f"Vectors have dimension {vectors.shape[1]}, index expects {index.d}")
+
+
+def bulk_embedder_from_env(embed_batch: Callable[[List[str]], np.ndarray], model_id: str,
+                           count_tokens: Callable[[str], int] = approximate_tokens,
+                           remote: bool = True) -> BulkEmbedder:
+    """BulkEmbedder configured from KRISHNA_EMBED_BATCH_TOKENS / _BATCH_SIZE / _BUILD_CONCURRENCY /
+    _CHECKPOINT_DIR; local models default to one batch at a time"""
+    return BulkEmbedder(
+        embed_batch,
+        model_id,
+        count_tokens=count_tokens,
+        max_batch_tokens=int(os.getenv("KRISHNA_EMBED_BATCH_TOKENS", str(MAX_BATCH_TOKENS))),
+        max_batch_size=int(os.getenv("KRISHNA_EMBED_BATCH_SIZE", str(MAX_BATCH_SIZE if remote else 256))),
+        concurrency=int(os.getenv("KRISHNA_EMBED_BUILD_CONCURRENCY", "8" if remote else "1")),
+        checkpoint_dir=os.getenv("KRISHNA_EMBED_CHECKPOINT_DIR", "storage/embed_checkpoints") or None,
+    )
@@ -0,0 +1,185 @@
+import re
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from ingestion import Chunk
+
+# Same references extract_verses recognises in generated answers
+VERSE_PATTERNS = [
+    r'Chapter\s+(\d{1,2}),?\s+Verse\s+(\d{1,2})\b',  # "Chapter X, Verse Y"
+    r'Gita\s+(\d{1,2})\.(\d{1,2})\b',                # "Gita X.Y"
+    r'BG\s+(\d{1,2})\.(\d{1,2})\b'                   # "BG X.Y"
+]
+VERSE_MARKER = re.compile("|".join(f"(?:{pattern})" for pattern in VERSE_PATTERNS))
+SENTENCE_END = re.compile(r'(?<=[.!?।॥])\s+')
+WORD_PIECE = re.compile(r"\w+|[^\w\s]")
+
+
+def approximate_tokens(text: str) -> int:
+    """Word/punctuation count, a close stand-in for subword tokens on English text"""
+    return len(WORD_PIECE.findall(text))
+
+
+def make_token_counter(model=None, model_id: str = "") -> Callable[[str], int]:
+    """Count tokens with the embedding model's own tokenizer when one is available"""
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is not None:
+        return lambda text: len(tokenizer.tokenize(text))
+    if model_id.startswith("text-embedding"):
+        try:
+            import tiktoken
+            encoding = tiktoken.get_encoding("cl100k_base")
+            return lambda text: len(encoding.encode(text, disallowed_special=()))
+        except ImportError:
+            pass
+    return approximate_tokens
+
+
+def _verse_ref(match: re.Match) -> Optional[Tuple[int, int]]:
+    numbers = [int(g) for g in match.groups() if g is not None]
+    if len(numbers) == 2 and 1 <= numbers[0] <= 18 and 1 <= numbers[1] <= 78:
+        return numbers[0], numbers[1]
+    return None
+
+
+def split_at_verses(text: str) -> Iterator[Tuple[Optional[Tuple[int, int]], str]]:
+    """Yield (verse reference or None, segment), cutting the text before each verse marker"""
+    position = 0
+    for match in VERSE_MARKER.finditer(text):
+        ref = _verse_ref(match)
+        if ref is None:
+            continue
+        if match.start() > position:
+            yield None, text[position:match.start()]
+        position = match.start()
+        # The marker's segment runs to the next marker (or the end)
+        next_match = VERSE_MARKER.search(text, match.end())
+        end = next_match.start() if next_match else len(text)
+        yield ref, text[position:end]
+        position = end
+    if position < len(text):
+        yield None, text[position:]
+
+
+class VerseChunker:
+    """Streams chunks sized in embedding-model tokens that start at verse boundaries
+
+    A verse marker closes the current chunk (once it holds at least
+    `min_tokens`) so a verse and its commentary stay together. Chunks that
+    hit `chunk_tokens` mid-verse carry their last `overlap_tokens` worth of
+    sentences into the next chunk. A remainder shorter than `min_tokens` at
+    the end of a document joins the chunk before it when both fit in
+    `chunk_tokens` (and it is not another chapter); no text is dropped. Each
+    chunk's metadata gets the chapter and verse range it covers plus its
+    token count.
+    """
+
+    def __init__(self, chunk_tokens: int = 256, overlap_tokens: int = 32, min_tokens: int = 48,
+                 count_tokens: Callable[[str], int] = approximate_tokens):
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = min(overlap_tokens, chunk_tokens // 2)
+        self.min_tokens = min(min_tokens, chunk_tokens)
+        self.count_tokens = count_tokens
+
+    @property
+    def signature(self) -> str:
+        return f"verse-chunker;v=2;tokens={self.chunk_tokens};overlap={self.overlap_tokens};min={self.min_tokens}"
+
+    def _units(self, segment: str) -> Iterator[Tuple[str, int]]:
+        """Sentences with token counts, hard-splitting any sentence longer than a chunk"""
+        for sentence in SENTENCE_END.split(segment.strip()):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            tokens = self.count_tokens(sentence)
+            if tokens <= self.chunk_tokens:
+                yield sentence, tokens
+                continue
+            words = sentence.split()
+            step = max(1, len(words) * self.chunk_tokens // tokens)
+            for i in range(0, len(words), step):
+                piece = " ".join(words[i:i + step])
+                yield piece, self.count_tokens(piece)
+
+    def chunk(self, paragraphs: Iterable[Tuple[str, str, int, int]]) -> Iterator[Chunk]:
+        """(paragraph, source, first page, last page) stream -> Chunk stream"""
+        units: List[Tuple[str, int]] = []
+        tokens = 0
+        carried = 0  # leading units repeated from the previous chunk as overlap
+        meta = None
+        chapter, verse = None, None
+        pending: Optional[Chunk] = None  # held back so a short remainder can join it
+
+        def emit():
+            """Close the current chunk; returns the previous one once it can no longer grow"""
+            nonlocal pending
+            text = " ".join(unit for unit, _ in units).strip()
+            if not text:
+                return None
+            fresh = units[carried:]
+            fresh_tokens = sum(unit_tokens for _, unit_tokens in fresh)
+            if (tokens < self.min_tokens and pending is not None
+                    and pending.metadata["source"] == meta["source"]
+                    and meta["chapter"] in (None, pending.metadata["chapter"])
+                    and pending.metadata["tokens"] + fresh_tokens <= self.chunk_tokens):
+                merged = {**pending.metadata, "page_end": meta["page_end"],
+                          "tokens": pending.metadata["tokens"] + fresh_tokens}
+                if meta["verse_end"] is not None:
+                    if merged["chapter"] is None:
+                        merged["chapter"], merged["verse_start"] = meta["chapter"], meta["verse_start"]
+                    merged["verse_end"] = meta["verse_end"]
+                fresh_text = " ".join(unit for unit, _ in fresh).strip()
+                pending = Chunk(f"{pending.text} {fresh_text}".strip(), merged)
+                return None
+            ready, pending = pending, Chunk(text, {**meta, "tokens": tokens})
+            return ready
+
+        for para, source, first_page, last_page in paragraphs:
+            if meta is not None and source != meta["source"]:
+                chunk = emit()
+                if chunk:
+                    yield chunk
+                units, tokens, carried, meta = [], 0, 0, None
+                chapter, verse = None, None
+
+            for ref, segment in split_at_verses(para):
+                if ref is not None:
+                    if units and tokens >= self.min_tokens:
+                        chunk = emit()
+                        if chunk:
+                            yield chunk
+                        units, tokens, carried, meta = [], 0, 0, None
+                    chapter, verse = ref
+
+                for unit, unit_tokens in self._units(segment):
+                    if units and tokens + unit_tokens > self.chunk_tokens:
+                        chunk = emit()
+                        if chunk:
+                            yield chunk
+                        # Carry trailing sentences over as overlap
+                        overlap, overlap_tokens = [], 0
+                        for prev, prev_tokens in reversed(units):
+                            if overlap_tokens + prev_tokens > self.overlap_tokens:
+                                break
+                            overlap.insert(0, (prev, prev_tokens))
+                            overlap_tokens += prev_tokens
+                        units, tokens, carried = overlap, overlap_tokens, len(overlap)
+                        meta = {**meta, "page_start": first_page, "chapter": chapter,
+                                "verse_start": verse, "verse_end": verse}
+
+                    if meta is None:
+                        meta = {"source": source, "page_start": first_page, "page_end": last_page,
+                                "chapter": chapter, "verse_start": verse, "verse_end": verse}
+                    units.append((unit, unit_tokens))
+                    tokens += unit_tokens
+                    meta["page_end"] = last_page
+                    if verse is not None:
+                        if meta["chapter"] is None:
+                            meta["chapter"], meta["verse_start"] = chapter, verse
+                        meta["verse_end"] = verse
+
+        if units:
+            chunk = emit()
+            if chunk:
+                yield chunk
+        if pending is not None:
+            yield pending
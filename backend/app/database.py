@@ -1,45 +1,106 @@
 import json
 import os
-from typing import List, Optional
-from models import Verse
+import hashlib
+from typing import Dict, List, Optional, Sequence, Tuple
+from lexical import BM25Index, tokenize
+from verse_store import VerseRecord, VerseStore
 
 class GitaDatabase:
     def __init__(self, data_path: str = "data/bhagavad_gita.json"):
         self.data_path = data_path
-        self.verses = []
+        # Verses live once, column by column; lookups below hold row numbers
+        self.verses = VerseStore()
+        self.by_reference: Dict[Tuple[int, int], int] = {}
+        self.by_chapter: Dict[int, List[int]] = {}
+        self.by_theme: Dict[str, List[int]] = {}
+        self.lexical = BM25Index()
+        # Postings are persisted next to the verse JSON
+        self.lexical_path = os.path.splitext(data_path)[0] + ".bm25.json"
         self.load_data()
     
     def load_data(self):
         try:
-            with open(self.data_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.verses = [Verse(**verse) for verse in data]
+            with open(self.data_path, 'rb') as f:
+                raw = f.read()
         except FileNotFoundError:
             print(f"Data file not found: {self.data_path}")
-            self.verses = []
+            self.build_indexes(VerseStore(), BM25Index())
+            return
+        # Rows go straight into columns; pydantic models are built per response, not per load
+        verses = VerseStore.from_records(json.loads(raw))
+        checksum = hashlib.sha256(raw).hexdigest()
+        self.build_indexes(verses, self.load_lexical_index(verses, checksum))
     
-    def get_all_verses(self) -> List[Verse]:
+    def build_indexes(self, verses: VerseStore, lexical: BM25Index):
+        """Lookup tables built once per load so requests never scan or lower-case verses"""
+        by_reference, by_chapter, by_theme = {}, {}, {}
+        for position, verse in enumerate(verses):
+            by_reference.setdefault((verse.chapter, verse.verse_number), position)
+            by_chapter.setdefault(verse.chapter, []).append(position)
+            themes = [theme.lower() for theme in verse.themes]
+            for theme in set(themes):
+                by_theme.setdefault(theme, []).append(position)
+        
+        # Assigned only once built, since a reload may run while requests are reading
+        self.verses, self.by_reference, self.by_chapter = verses, by_reference, by_chapter
+        self.by_theme, self.lexical = by_theme, lexical
+    
+    def load_lexical_index(self, verses: VerseStore, checksum: Optional[str]) -> BM25Index:
+        """Saved BM25 postings when they match the data file, otherwise rebuilt and saved"""
+        index = BM25Index.load(self.lexical_path, checksum)
+        if index is not None and len(index) == len(verses):
+            return index
+        # Sanskrit is indexed for exact-term queries; themes count twice as they
+        # are short and chosen to describe the verse
+        index = BM25Index.build(
+            (tokenize(" ".join([v.sanskrit, v.english, v.hindi, *v.themes, *v.themes])) for v in verses),
+            checksum=checksum
+        )
+        if checksum is not None:
+            try:
+                index.save(self.lexical_path)
+            except OSError as e:
+                print(f"Could not save search index: {e}")
+        return index
+    
+    def checksum(self) -> Optional[str]:
+        """SHA-256 of the verse data file, used to detect stale embedding bundles"""
+        if not os.path.exists(self.data_path):
+            return None
+        digest = hashlib.sha256()
+        with open(self.data_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def get_all_verses(self) -> Sequence[VerseRecord]:
         return self.verses
     
-    def get_verse_by_reference(self, chapter: int, verse_number: int) -> Optional[Verse]:
-        for verse in self.verses:
-            if verse.chapter == chapter and verse.verse_number == verse_number:
-                return verse
-        return None
+    def get_verse_by_reference(self, chapter: int, verse_number: int) -> Optional[VerseRecord]:
+        return self.verses.get(self.by_reference.get((chapter, verse_number)))
     
-    def get_verses_by_chapter(self, chapter: int) -> List[Verse]:
-        return [v for v in self.verses if v.chapter == chapter]
+    def get_verses_by_chapter(self, chapter: int) -> List[VerseRecord]:
+        verses = self.verses
+        return [verses[i] for i in self.by_chapter.get(chapter, ())]
     
-    def get_verses_by_theme(self, theme: str) -> List[Verse]:
+    def get_verses_by_theme(self, theme: str) -> List[VerseRecord]:
         theme_lower = theme.lower()
-        return [v for v in self.verses if any(theme_lower in t.lower() for t in v.themes)]
-    
-    def search_verses(self, query: str) -> List[Verse]:
-        query_lower = query.lower()
-        results = []
-        for verse in self.verses:
-            if (query_lower in verse.english.lower() or 
-                query_lower in verse.hindi.lower() or
-                any(query_lower in theme.lower() for theme in verse.themes)):
-                results.append(verse)
-        return results
\ No newline at end of file
+        verses = self.verses
+        # Substring match over the (few) distinct themes, not over every verse
+        matched = [positions for t, positions in self.by_theme.items() if theme_lower in t]
+        if len(matched) == 1:
+            positions = matched[0]
+        else:
+            positions = sorted(set().union(*matched))
+        return [verses[i] for i in positions]
+    
+    def search_verses(self, query: str, limit: Optional[int] = None, offset: int = 0) -> List[VerseRecord]:
+        """BM25-ranked keyword search over Sanskrit, English, Hindi and themes; every match by default"""
+        return [verse for verse, _ in self.search_verses_scored(query, limit, offset)[1]]
+    
+    def search_verses_scored(self, query: str, limit: Optional[int] = 10,
+                             offset: int = 0) -> Tuple[int, List[Tuple[VerseRecord, float]]]:
+        """(total matches, [(verse, score)]) for one page of results"""
+        verses = self.verses
+        total, hits = self.lexical.search(query, limit=limit, offset=offset)
+        return total, [(verses[i], score) for i, score in hits]
\ No newline at end of file
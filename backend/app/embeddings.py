@@ -1,13 +1,35 @@
 import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from pathlib import Path
 import numpy as np
-import faiss
-from sentence_transformers import SentenceTransformer
-from typing import List, Tuple
+from typing import Any, List, Optional, Sequence, Tuple
 import openai
 from dotenv import load_dotenv
+from snapshot import read_index, write_atomic
+from lazy import lazy_import
+from encoders import LOCAL_MODEL, encoder_from_env
+from metrics import record_openai_error, record_usage, timed
+from query_cache import QueryCache
+from bulk_embed import bulk_embedder_from_env, check_compatible
+from chunking import make_token_counter
+from index_factory import (
+    add_vectors, build_index, build_signature, index_config_from_env, prepare_vectors, remove_ids,
+    set_search_params, truncate_embeddings
+)
 
 load_dotenv()
 
+# faiss is imported on first use, not when the app module loads
+faiss = lazy_import("faiss")
+
+BUNDLE_VERSION = 2
+BUNDLE_MANIFEST = "bundle.json"
+BUNDLE_INDEX = "gita_embeddings.index"
+BUNDLE_METADATA = "verse_keys.json"
+
 class EmbeddingManager:
     def __init__(self, use_openai: bool = False):
         self.use_openai = use_openai
@@ -15,65 +37,284 @@ class EmbeddingManager:
         
         if use_openai and self.openai_api_key:
             openai.api_key = self.openai_api_key
+            # BulkEmbedder does its own Retry-After backoff; no SDK retries underneath it
+            self.bulk_client = openai.OpenAI(api_key=self.openai_api_key, max_retries=0)
             self.model_name = "text-embedding-3-small"
         else:
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
-            self.model_name = "all-MiniLM-L6-v2"
+            # PyTorch, or the ONNX export when KRISHNA_ENCODER=onnx|onnx-int8
+            self.model = encoder_from_env(LOCAL_MODEL)
+            self.model_name = LOCAL_MODEL
         
-        self.dimension = 1536 if use_openai else 384
+        # Optional prefix truncation of OpenAI embeddings (e.g. 1536 -> 256 dims)
+        self.embedding_dimensions = int(os.getenv("KRISHNA_EMBEDDING_DIMENSIONS", "0")) or None
+        self.dimension = (self.embedding_dimensions or 1536) if use_openai else 384
+        # Id-mapped so verses can be added, changed and removed without a rebuild
+        self.index_config = {**index_config_from_env(), "id_map": True}
+        self.tombstones = set()
+        self.update_lock = threading.Lock()
         self.index = faiss.IndexFlatL2(self.dimension)
-        self.verse_texts = []
-        self.verse_metadata = []
-    
-    def get_embeddings(self, texts: List[str]) -> np.ndarray:
-        if self.use_openai and self.openai_api_key:
-            try:
-                response = openai.embeddings.create(
-                    input=texts,
-                    model=self.model_name
-                )
+        # Per index id: the verse's (chapter, verse_number) and a digest of its embedded
+        # text; verse content itself stays in the database's verse store
+        self.verse_keys: List[Optional[Tuple[int, int]]] = []
+        self.verse_digests: List[Optional[str]] = []
+        self.index_version = None
+        self.query_cache = QueryCache(
+            max_size=int(os.getenv("KRISHNA_QUERY_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("KRISHNA_QUERY_CACHE_TTL", "3600"))
+        )
+        # Verse embedding runs through token-bounded, concurrent, checkpointed batches
+        model_id = self.model_name + (f"@{self.embedding_dimensions}" if self.embedding_dimensions else "")
+        self.bulk_embedder = bulk_embedder_from_env(
+            lambda texts: self.get_embeddings(texts, client=getattr(self, "bulk_client", None)), model_id,
+            make_token_counter(getattr(self, "model", None), self.model_name),
+            remote=self.model_name.startswith("text-embedding")
+        )
+    
+    def get_embeddings(self, texts: List[str], client=None) -> np.ndarray:
+        # No local fallback on errors: its vectors would not match the index
+        with timed("embed"):
+            if self.use_openai and self.openai_api_key:
+                try:
+                    response = (client or openai).embeddings.create(
+                        input=texts,
+                        model=self.model_name
+                    )
+                except Exception as e:
+                    record_openai_error("embeddings", e)
+                    raise
+                record_usage("embeddings", response)
                 embeddings = np.array([item.embedding for item in response.data])
-                return embeddings
-            except Exception as e:
-                print(f"OpenAI embedding failed, falling back to local model: {e}")
-                if not hasattr(self, 'model'):
-                    self.model = SentenceTransformer('all-MiniLM-L6-v2')
-                    self.dimension = 384
+                return truncate_embeddings(embeddings, self.embedding_dimensions)
+            else:
                 return self.model.encode(texts)
-        else:
-            return self.model.encode(texts)
-    
-    def add_verses(self, verses: List[dict]):
-        texts = []
-        for verse in verses:
-            # Combine English and themes for better semantic search
-            combined_text = f"{verse['english']} {' '.join(verse['themes'])}"
-            texts.append(combined_text)
-            self.verse_texts.append(combined_text)
-            self.verse_metadata.append(verse)
+    
+    @staticmethod
+    def _field(verse: Any, name: str):
+        return verse[name] if isinstance(verse, dict) else getattr(verse, name)
+    
+    @classmethod
+    def _verse_key(cls, verse: Any) -> Tuple[int, int]:
+        return int(cls._field(verse, "chapter")), int(cls._field(verse, "verse_number"))
+    
+    @classmethod
+    def _verse_text(cls, verse: Any) -> str:
+        # Combine English and themes for better semantic search
+        return f"{cls._field(verse, 'english')} {' '.join(cls._field(verse, 'themes'))}"
+    
+    @staticmethod
+    def _text_digest(text: str) -> str:
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+    
+    def add_verses(self, verses: Sequence[Any]):
+        """Embed verses (VerseRecords, models or dicts) under the next free ids"""
+        start = len(self.verse_keys)
+        texts = [self._verse_text(verse) for verse in verses]
         
-        embeddings = self.get_embeddings(texts)
-        self.index.add(embeddings.astype('float32'))
+        embeddings = self.bulk_embedder.embed(texts)
+        check_compatible(self.index, embeddings, None, self.model_name)
+        ids = np.arange(start, start + len(texts))
+        if self.index.ntotal == 0:
+            # First batch builds (and trains, for IVF types) the configured index
+            self.index = build_index(embeddings, ids=ids, **self.index_config)
+        else:
+            add_vectors(self.index, embeddings, ids, self.index_config["metric"])
+        # Only once the vectors are in, so ids stay positions in verse_keys if embedding fails
+        self.verse_keys.extend(self._verse_key(verse) for verse in verses)
+        self.verse_digests.extend(self._text_digest(text) for text in texts)
+        self._set_index_version(f"local-{self.index.ntotal}")
+    
+    def update_verses(self, verses: Sequence[Any]) -> dict:
+        """Embed only new or changed verses and drop removed ones, then swap the index
+
+        Ids are positions in verse_keys and are never reused; removed verses
+        leave a None placeholder. A verse counts as changed when its embedded
+        text does. The update runs on a copy of the index, so searches in
+        flight keep using the old one until the swap.
+        """
+        with self.update_lock:
+            if not self.verse_keys:
+                self.add_verses(verses)
+                return {"added": len(verses), "removed": 0, "total_verses": len(verses)}
+            
+            current = {key: i for i, key in enumerate(self.verse_keys) if key is not None}
+            incoming = {}
+            for verse in verses:
+                text = self._verse_text(verse)
+                incoming[self._verse_key(verse)] = (text, self._text_digest(text))
+            stale = [
+                i for key, i in current.items()
+                if key not in incoming or self.verse_digests[i] != incoming[key][1]
+            ]
+            fresh = [
+                key for key, (_, digest) in incoming.items()
+                if key not in current or self.verse_digests[current[key]] != digest
+            ]
+            if not stale and not fresh:
+                return {"added": 0, "removed": 0, "total_verses": len(current)}
+            
+            index = faiss.clone_index(self.index)
+            tombstones = set(self.tombstones)
+            if not remove_ids(index, stale):
+                tombstones.update(stale)
+            
+            keys = list(self.verse_keys)
+            digests = list(self.verse_digests)
+            for i in stale:
+                keys[i] = None
+                digests[i] = None
+            
+            if fresh:
+                new_texts = [incoming[key][0] for key in fresh]
+                embeddings = self.bulk_embedder.embed(new_texts)
+                check_compatible(index, embeddings, None, self.model_name)
+                add_vectors(index, embeddings, np.arange(len(keys), len(keys) + len(fresh)),
+                            self.index_config["metric"])
+                keys += fresh
+                digests += [incoming[key][1] for key in fresh]
+            set_search_params(index, self.index_config["nprobe"], self.index_config["ef_search"])
+            
+            # Swap everything in one step
+            self.index, self.tombstones = index, tombstones
+            self.verse_keys, self.verse_digests = keys, digests
+            self._set_index_version(f"update-{datetime.now().isoformat()}")
+            
+            # Changed verses count as one removal plus one addition
+            return {"added": len(fresh), "removed": len(stale), "total_verses": len(incoming)}
+    
+    def _set_index_version(self, version: str):
+        self.index_version = version
+        self.query_cache.set_version(version)
+    
+    def encode_query(self, query: str) -> np.ndarray:
+        """(1, d) query embedding, cached per normalized query text"""
+        cache_key = self.query_cache.make_key(query, "embedding")
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        query_embedding = self.get_embeddings([query]).astype('float32')
+        self.query_cache.put(cache_key, query_embedding)
+        return query_embedding
+    
+    def _search_index(self, query_embedding: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Over-fetch past tombstoned ids the index could not delete
+        with timed("search"):
+            distances, indices = self.index.search(
+                prepare_vectors(query_embedding, self.index_config["metric"]), k + len(self.tombstones)
+            )
+        return distances[0], indices[0]
     
-    def search(self, query: str, k: int = 3, emotion_themes: List[str] = None) -> List[Tuple[dict, float]]:
+    def _live_results(self, distances: np.ndarray, indices: np.ndarray, k: int) -> List[Tuple[Tuple[int, int], float]]:
+        results = []
+        keys = self.verse_keys
+        for i, idx in enumerate(indices):
+            if 0 <= idx < len(keys) and idx not in self.tombstones and keys[idx] is not None:
+                results.append((keys[idx], float(distances[i])))
+        return results[:k]
+    
+    def search(self, query: str, k: int = 3,
+               emotion_themes: List[str] = None) -> List[Tuple[Tuple[int, int], float]]:
+        """[((chapter, verse_number), distance)] for the k nearest live verses"""
         # If emotion themes provided, modify query to include them
         if emotion_themes:
             enhanced_query = f"{query} {' '.join(emotion_themes)}"
         else:
             enhanced_query = query
         
-        query_embedding = self.get_embeddings([enhanced_query])
-        distances, indices = self.index.search(query_embedding.astype('float32'), k)
-        
-        results = []
-        for i, idx in enumerate(indices[0]):
-            if idx < len(self.verse_metadata):
-                results.append((self.verse_metadata[idx], float(distances[0][i])))
+        cache_key = self.query_cache.make_key(query, k, tuple(emotion_themes or ()))
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            _, distances, indices = cached
+        else:
+            query_embedding = self.get_embeddings([enhanced_query]).astype('float32')
+            distances, indices = self._search_index(query_embedding, k)
+            self.query_cache.put(cache_key, (query_embedding[0], distances, indices))
         
-        return results
+        return self._live_results(distances, indices, k)
+    
+    def search_vector(self, query_embedding: np.ndarray, k: int = 3) -> List[Tuple[Tuple[int, int], float]]:
+        """search() for a query that is already embedded (e.g. an emotion-boosted vector)"""
+        distances, indices = self._search_index(np.asarray(query_embedding, dtype='float32'), k)
+        return self._live_results(distances, indices, k)
     
     def save_index(self, filepath: str):
         faiss.write_index(self.index, filepath)
     
     def load_index(self, filepath: str):
-        self.index = faiss.read_index(filepath)
\ No newline at end of file
+        self.index = faiss.read_index(filepath)
+    
+    def save_bundle(self, directory: str, data_checksum: str):
+        """Write a self-describing bundle: index, verse metadata and a manifest"""
+        bundle_dir = Path(directory)
+        bundle_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = bundle_dir / BUNDLE_MANIFEST
+        try:
+            manifest_path.unlink()
+        except FileNotFoundError:
+            pass
+        
+        # Every file goes through its own temp file: workers may save the same bundle at once
+        write_atomic(bundle_dir / BUNDLE_INDEX, lambda p: self.save_index(str(p)))
+        metadata = json.dumps({"verse_keys": self.verse_keys, "verse_digests": self.verse_digests})
+        write_atomic(bundle_dir / BUNDLE_METADATA, lambda p: p.write_text(metadata, encoding='utf-8'))
+        
+        manifest = {
+            "version": BUNDLE_VERSION,
+            "model_name": self.model_name,
+            "embedding_dimensions": self.embedding_dimensions,
+            "dimension": self.index.d,
+            "index": build_signature(self.index_config),
+            "data_checksum": data_checksum,
+            "total_verses": sum(1 for key in self.verse_keys if key is not None),
+            "tombstones": sorted(int(i) for i in self.tombstones),
+            "created": datetime.now().isoformat(),
+        }
+        # Manifest goes last so an interrupted build never looks complete
+        write_atomic(manifest_path, lambda p: p.write_text(json.dumps(manifest, indent=2), encoding='utf-8'))
+    
+    def load_bundle(self, directory: str, data_checksum: Optional[str] = None, mmap: bool = False) -> bool:
+        """Load a bundle built by setup_embeddings.py; False if missing or stale
+
+        With mmap=True the index is mapped read-only where FAISS supports it,
+        so workers forked from a preloaded master share its pages.
+        """
+        bundle_dir = Path(directory)
+        try:
+            with open(bundle_dir / BUNDLE_MANIFEST, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        
+        if manifest.get("version") != BUNDLE_VERSION or manifest.get("model_name") != self.model_name:
+            print(f"Embedding bundle was built with {manifest.get('model_name')}, expected {self.model_name}")
+            return False
+        if manifest.get("embedding_dimensions") != self.embedding_dimensions:
+            print("Embedding bundle was built with a different KRISHNA_EMBEDDING_DIMENSIONS")
+            return False
+        if manifest.get("index", {"index_type": "flat"}) != build_signature(self.index_config):
+            print(f"Embedding bundle index {manifest.get('index')} differs from configured index")
+            return False
+        if data_checksum and manifest.get("data_checksum") != data_checksum:
+            print("Embedding bundle checksum does not match verse data")
+            return False
+        
+        try:
+            index = read_index(str(bundle_dir / BUNDLE_INDEX), mmap=mmap)
+            with open(bundle_dir / BUNDLE_METADATA, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+        except Exception as e:
+            print(f"Embedding bundle unreadable: {e}")
+            return False
+        
+        # Removed verses stay as None placeholders, so the index may be smaller
+        if index.ntotal > len(metadata["verse_keys"]):
+            print("Embedding bundle index and metadata disagree")
+            return False
+        
+        set_search_params(index, self.index_config["nprobe"], self.index_config["ef_search"])
+        self.index = index
+        self.dimension = manifest["dimension"]
+        self.verse_keys = [tuple(key) if key else None for key in metadata["verse_keys"]]
+        self.verse_digests = metadata["verse_digests"]
+        self.tombstones = set(manifest.get("tombstones", []))
+        self._set_index_version(f"{manifest['data_checksum']}:{manifest['created']}")
+        return True
\ No newline at end of file
@@ -0,0 +1,107 @@
+import re
+from typing import Dict, Iterable, List, Optional
+
+EMOTION_KEYWORDS = {
+    "sadness": ["sad", "depressed", "grief", "sorrow", "crying", "tears", "lost", "lonely", "hopeless"],
+    "anger": ["angry", "furious", "rage", "hate", "annoyed", "frustrated", "mad", "irritated"],
+    "fear": ["afraid", "scared", "anxious", "worry", "worried", "panic", "nervous", "terrified", "phobia"],
+    "confusion": ["confused", "lost", "don't understand", "puzzled", "unclear", "bewildered"],
+    "guilt": ["guilty", "shame", "regret", "sorry", "fault", "blame", "remorse"],
+    "love": ["love", "affection", "care", "devotion", "heart", "romance", "relationship"],
+    "stress": ["stressed", "overwhelmed", "pressure", "burden", "exhausted", "tired"],
+    "doubt": ["doubt", "uncertain", "question", "unsure", "skeptical", "hesitant"],
+    "joy": ["happy", "joyful", "excited", "celebration", "grateful", "blessed", "content"]
+}
+
+# The simple backend's smaller emotion set (backend/main.py), which answers
+# with the first emotion that matches rather than the highest score
+SIMPLE_EMOTION_KEYWORDS = {
+    "sadness": ["sad", "depressed", "sorrow", "grief", "crying", "lost"],
+    "anger": ["angry", "mad", "furious", "rage", "frustrated"],
+    "fear": ["afraid", "scared", "worry", "anxious", "panic"],
+    "confusion": ["confused", "lost", "unclear", "don't understand"],
+    "stress": ["stressed", "overwhelmed", "pressure", "exhausted"]
+}
+
+# Verb and plural inflections any keyword may carry ("hated", "worrying",
+# "doubts"), but not arbitrary letters, so "mad" does not match "made"
+SUFFIXES = r"(?:s|es|d|ed|ing)?"
+
+# Other derived forms, per keyword: a blanket -ful/-ly/-ness would also turn
+# "careful" into love and "madly" into anger
+KEYWORD_FORMS = {
+    "sad": ["sadness"],
+    "hopeless": ["hopelessness", "hopelessly"],
+    "nervous": ["nervousness", "nervously"],
+    "anxious": ["anxiousness", "anxiously"],
+    "hate": ["hateful"],
+    "regret": ["regretful"],
+    "shame": ["shameful"],
+    "doubt": ["doubtful"],
+    "grateful": ["gratefulness"],
+    "joyful": ["joyfulness"],
+}
+
+
+class KeywordEmotionDetector:
+    """Scores every emotion in one regex pass over the text
+
+    All keywords are compiled into a single alternation anchored on word
+    boundaries; each distinct keyword found adds one point to every emotion
+    that lists it, and the highest score wins (ties go to the emotion listed
+    first, as before). With first_match=True the first emotion listed that
+    matches at all wins, whatever the scores.
+    """
+
+    def __init__(self, keywords: Dict[str, List[str]] = EMOTION_KEYWORDS,
+                 forms: Dict[str, List[str]] = KEYWORD_FORMS, first_match: bool = False):
+        self.keywords = keywords
+        self.first_match = first_match
+        self.emotions_by_keyword: Dict[str, List[str]] = {}
+        for emotion, words in keywords.items():
+            for word in words:
+                self.emotions_by_keyword.setdefault(word.lower(), []).append(emotion)
+        self.keyword_by_form = {word: word for word in self.emotions_by_keyword}
+        for word, derived in forms.items():
+            if word in self.emotions_by_keyword:
+                self.keyword_by_form.update((form.lower(), word) for form in derived)
+        # Longest first so multi-word phrases win over their prefixes
+        alternation = "|".join(
+            re.escape(form).replace(r"\ ", r"\s+")
+            for form in sorted(self.keyword_by_form, key=len, reverse=True)
+        )
+        self.pattern = re.compile(rf"\b({alternation}){SUFFIXES}\b")
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return text.lower().replace("\u2019", "'")
+
+    def scores(self, text: str) -> Dict[str, int]:
+        found = {
+            self.keyword_by_form[" ".join(match.group(1).split())]
+            for match in self.pattern.finditer(self._normalize(text))
+        }
+        scores: Dict[str, int] = {}
+        for word in found:
+            for emotion in self.emotions_by_keyword[word]:
+                scores[emotion] = scores.get(emotion, 0) + 1
+        return scores
+
+    def detect(self, text: str) -> Optional[str]:
+        scores = self.scores(text)
+        if not scores:
+            return None
+        best = 1 if self.first_match else max(scores.values())
+        return next(emotion for emotion in self.keywords if scores.get(emotion, 0) >= best)
+
+    def detect_batch(self, texts: Iterable[str]) -> List[Optional[str]]:
+        return [self.detect(text) for text in texts]
+
+
+default_detector = KeywordEmotionDetector()
+simple_detector = KeywordEmotionDetector(SIMPLE_EMOTION_KEYWORDS, first_match=True)
+
+
+def detect_emotion(text: str) -> Optional[str]:
+    """Emotion of a query with the shared keyword detector, or None"""
+    return default_detector.detect(text)
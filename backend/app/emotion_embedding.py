@@ -0,0 +1,93 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype='float32')
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class EmbeddingEmotionClassifier:
+    """Emotion detection and theme boosting on an already computed query embedding
+
+    `build` encodes every emotion's keywords and mapped themes once, in one
+    batch, into an emotion prototype and a theme vector. Requests then score
+    their query embedding against the prototypes and nudge it toward the
+    detected emotion's themes, instead of encoding "query + themes" again.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], np.ndarray],
+        emotion_keywords: Dict[str, List[str]],
+        emotion_themes: Dict[str, List[str]],
+        min_similarity: float = 0.3,
+        boost: float = 0.3,
+        keyword_detector: Optional[Callable[[str], Optional[str]]] = None,
+    ):
+        self.encode = encode
+        self.emotion_keywords = emotion_keywords
+        self.emotion_themes = emotion_themes
+        self.min_similarity = min_similarity
+        self.boost_weight = boost
+        self.keyword_detector = keyword_detector
+        self.emotions: List[str] = []
+        self.prototypes: Optional[np.ndarray] = None
+        self.theme_vectors: Optional[np.ndarray] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.prototypes is not None
+
+    def build(self):
+        emotions = list(self.emotion_keywords)
+        texts, owners = [], []
+        for row, emotion in enumerate(emotions):
+            for phrase in [emotion, *self.emotion_keywords[emotion]]:
+                texts.append(f"I feel {phrase}")
+                owners.append(("prototype", row))
+            for theme in self.emotion_themes.get(emotion, []):
+                texts.append(theme.replace("_", " "))
+                owners.append(("theme", row))
+
+        vectors = _normalize(self.encode(texts))
+        prototypes = np.zeros((len(emotions), vectors.shape[1]), dtype='float32')
+        theme_vectors = np.zeros_like(prototypes)
+        for (kind, row), vector in zip(owners, vectors):
+            (prototypes if kind == "prototype" else theme_vectors)[row] += vector
+
+        self.emotions = emotions
+        self.theme_vectors = _normalize(theme_vectors)
+        self.prototypes = _normalize(prototypes)
+
+    def classify(self, query_vector: np.ndarray) -> Tuple[Optional[str], float]:
+        """(closest emotion or None below min_similarity, cosine similarity)"""
+        query = _normalize(np.asarray(query_vector).reshape(-1))
+        if not self.ready or query.shape[0] != self.prototypes.shape[1]:
+            return None, 0.0
+        similarities = self.prototypes @ query
+        best = int(np.argmax(similarities))
+        score = float(similarities[best])
+        return (self.emotions[best] if score >= self.min_similarity else None), score
+
+    def detect(self, text: str, query_vector: np.ndarray) -> Optional[str]:
+        """Explicit emotion words win; otherwise the embedding decides"""
+        if self.keyword_detector is not None:
+            emotion = self.keyword_detector(text)
+            if emotion:
+                return emotion
+        return self.classify(query_vector)[0]
+
+    def boost(self, query_vector: np.ndarray, emotion: str) -> np.ndarray:
+        """Query vector moved toward the emotion's themes, keeping its original norm"""
+        if not self.ready or emotion not in self.emotions:
+            return query_vector
+        query = np.asarray(query_vector, dtype='float32').reshape(1, -1)
+        theme = self.theme_vectors[self.emotions.index(emotion)]
+        if theme.shape[0] != query.shape[1]:
+            return query_vector
+        norm = float(np.linalg.norm(query)) or 1.0
+        boosted = _normalize(query / norm + self.boost_weight * theme)
+        return (boosted * norm).astype('float32')
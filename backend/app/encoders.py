@@ -0,0 +1,170 @@
+import os
+import sys
+import json
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+LOCAL_MODEL = "all-MiniLM-L6-v2"
+ENCODER_BACKENDS = ("torch", "onnx", "onnx-int8")
+ONNX_FILES = {"onnx": "model.onnx", "onnx-int8": "model_int8.onnx"}
+ENCODER_MANIFEST = "encoder.json"
+DEFAULT_ONNX_DIR = f"storage/onnx/{LOCAL_MODEL}"
+
+
+def encoder_threads() -> int:
+    """Intra-op threads for this process: KRISHNA_ENCODER_THREADS, else all cores
+
+    gunicorn.conf.py sets KRISHNA_ENCODER_THREADS to cores / workers, so the
+    workers' thread pools together fit the machine instead of each one
+    spinning up a thread per core.
+    """
+    threads = int(os.getenv("KRISHNA_ENCODER_THREADS", "0"))
+    return threads if threads > 0 else max(1, os.cpu_count() or 1)
+
+
+class TokenCounter:
+    """`tokenize(text)` over a `tokenizers` tokenizer, for make_token_counter"""
+
+    def __init__(self, tokenizer):
+        self._tokenizer = tokenizer
+
+    def tokenize(self, text: str) -> List[str]:
+        return self._tokenizer.encode(text, add_special_tokens=False).tokens
+
+
+class TorchEncoder:
+    """sentence-transformers on PyTorch, the reference implementation"""
+
+    backend = "torch"
+
+    def __init__(self, model_name: str = LOCAL_MODEL, threads: Optional[int] = None):
+        import torch
+        import sentence_transformers
+        self.threads = threads or encoder_threads()
+        torch.set_num_threads(self.threads)
+        self.model_name = model_name
+        self.model = sentence_transformers.SentenceTransformer(model_name)
+        self.tokenizer = self.model.tokenizer
+        self.dimension = self.model.get_sentence_embedding_dimension()
+        self.max_seq_length = self.model.max_seq_length
+
+    def encode(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True), dtype='float32')
+
+
+class OnnxEncoder:
+    """The exported transformer on ONNX Runtime, with the same mean pooling and normalization
+
+    Reads the directory written by export_encoder.py: model.onnx and/or
+    model_int8.onnx (dynamic int8 quantization), tokenizer.json and
+    encoder.json. The inference session is created per process on first
+    use, so a gunicorn master can preload the encoder and every forked
+    worker still gets its own thread pool of `threads` intra-op threads.
+    """
+
+    def __init__(self, model_dir: str = DEFAULT_ONNX_DIR, quantized: bool = False, threads: Optional[int] = None):
+        import onnxruntime  # noqa: F401 - fail here, not on the first query, when it is missing
+        from tokenizers import Tokenizer
+        self.backend = "onnx-int8" if quantized else "onnx"
+        self.model_dir = Path(model_dir)
+        self.model_path = self.model_dir / ONNX_FILES[self.backend]
+        if not self.model_path.exists():
+            raise FileNotFoundError(f"{self.model_path} not found; run export_encoder.py first")
+        with open(self.model_dir / ENCODER_MANIFEST, 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self.model_name = self.manifest["model"]
+        self.dimension = int(self.manifest["dimension"])
+        self.normalize = bool(self.manifest.get("normalize", True))
+        self.max_seq_length = int(self.manifest.get("max_seq_length", 256))
+        if self.manifest.get("agreement", {}).get(self.backend, {}).get("ok") is False:
+            raise ValueError(f"{self.model_path.name} failed the export agreement check")
+        self.threads = threads or encoder_threads()
+
+        tokenizer_path = str(self.model_dir / "tokenizer.json")
+        # Untruncated copy for counting chunk tokens; the other pads and truncates for inference
+        self.tokenizer = TokenCounter(Tokenizer.from_file(tokenizer_path))
+        self._tokenizer = Tokenizer.from_file(tokenizer_path)
+        self._tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self._tokenizer.enable_padding(pad_id=int(self.manifest.get("pad_id", 0)))
+        self._session = None
+        self._session_pid = None
+
+    def session(self):
+        if self._session is None or self._session_pid != os.getpid():
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = self.threads
+            options.inter_op_num_threads = 1
+            options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self._session = ort.InferenceSession(
+                str(self.model_path), sess_options=options, providers=["CPUExecutionProvider"]
+            )
+            self._input_names = {item.name for item in self._session.get_inputs()}
+            self._session_pid = os.getpid()
+        return self._session
+
+    def encode(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        session = self.session()
+        if isinstance(texts, str):
+            texts = [texts]
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self._tokenizer.encode_batch(list(texts[start:start + batch_size]))
+            feeds = {
+                "input_ids": np.array([e.ids for e in encodings], dtype='int64'),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype='int64'),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype='int64'),
+            }
+            hidden = session.run(None, {name: value for name, value in feeds.items() if name in self._input_names})[0]
+            # Mean pooling over real tokens, as in the sentence-transformers Pooling module
+            mask = feeds["attention_mask"][..., None].astype('float32')
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            if self.normalize:
+                pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+            outputs.append(pooled.astype('float32'))
+        if not outputs:
+            return np.zeros((0, self.dimension), dtype='float32')
+        return np.vstack(outputs)
+
+
+def load_encoder(backend: str, model_name: str = LOCAL_MODEL, model_dir: Optional[str] = None,
+                 threads: Optional[int] = None):
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{backend}', expected one of {ENCODER_BACKENDS}")
+    if backend == "torch":
+        return TorchEncoder(model_name, threads)
+    return OnnxEncoder(model_dir or DEFAULT_ONNX_DIR, quantized=backend == "onnx-int8", threads=threads)
+
+
+def encoder_from_env(model_name: str = LOCAL_MODEL):
+    """Local encoder chosen by KRISHNA_ENCODER (torch, onnx or onnx-int8) and KRISHNA_ENCODER_DIR
+
+    An ONNX backend that cannot load (no export yet, onnxruntime missing)
+    falls back to PyTorch. All backends embed into the same space, so the
+    index model id stays the same whichever one serves queries.
+    """
+    backend = os.getenv("KRISHNA_ENCODER", "torch").lower()
+    model_dir = os.getenv("KRISHNA_ENCODER_DIR", DEFAULT_ONNX_DIR)
+    if backend != "torch":
+        try:
+            encoder = load_encoder(backend, model_name, model_dir)
+            if encoder.model_name.split("/")[-1] != model_name.split("/")[-1]:
+                raise ValueError(f"{model_dir} holds {encoder.model_name}, not {model_name}")
+            print(f"⚙️ Encoder: {backend} ({encoder.threads} threads) from {model_dir}")
+            return encoder
+        except (ImportError, OSError, ValueError, KeyError) as e:
+            print(f"⚠️ {backend} encoder unavailable ({e}), using PyTorch")
+    encoder = TorchEncoder(model_name)
+    print(f"⚙️ Encoder: torch ({encoder.threads} threads)")
+    return encoder
+
+
+def configure_worker_threads():
+    """Re-apply the per-worker thread count after a fork (gunicorn post_fork)"""
+    threads = encoder_threads()
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+    return threads
@@ -0,0 +1,147 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+import metrics
+
+FUSION_METHODS = ("rrf", "weighted")
+
+# (key, payload, score) with higher scores better; the key identifies a verse across retrievers
+Candidate = Tuple[Hashable, Any, float]
+
+
+class FusionWeights(NamedTuple):
+    dense: float
+    lexical: float
+
+
+# Study queries name concepts and Sanskrit terms, emotion queries describe feelings
+DEFAULT_MODE_WEIGHTS = {
+    "default": FusionWeights(dense=1.0, lexical=1.0),
+    "emotion": FusionWeights(dense=1.0, lexical=0.5),
+    "study": FusionWeights(dense=0.6, lexical=1.4),
+}
+
+
+def mode_weights_from_env() -> Dict[str, FusionWeights]:
+    """Per-mode weights, overridable as KRISHNA_HYBRID_WEIGHTS="study=0.6:1.4,emotion=1:0" """
+    weights = dict(DEFAULT_MODE_WEIGHTS)
+    for item in os.getenv("KRISHNA_HYBRID_WEIGHTS", "").split(","):
+        mode, _, pair = item.partition("=")
+        dense, _, lexical = pair.partition(":")
+        if mode.strip() and dense and lexical:
+            weights[mode.strip().lower()] = FusionWeights(float(dense), float(lexical))
+    return weights
+
+
+def reciprocal_rank_fusion(rankings: List[Tuple[List[Candidate], float]], k: int = 60) -> Dict[Hashable, float]:
+    """sum(weight / (k + rank)) over every ranking a key appears in"""
+    fused: Dict[Hashable, float] = {}
+    for candidates, weight in rankings:
+        for rank, (key, _, _) in enumerate(candidates, start=1):
+            fused[key] = fused.get(key, 0.0) + weight / (k + rank)
+    return fused
+
+
+def weighted_score_fusion(rankings: List[Tuple[List[Candidate], float]]) -> Dict[Hashable, float]:
+    """Weighted sum of min-max normalized scores (scores are on different scales per retriever)"""
+    fused: Dict[Hashable, float] = {}
+    for candidates, weight in rankings:
+        if not candidates:
+            continue
+        scores = [score for _, _, score in candidates]
+        low, span = min(scores), (max(scores) - min(scores)) or 1.0
+        for key, _, score in candidates:
+            fused[key] = fused.get(key, 0.0) + weight * (score - low) / span
+    return fused
+
+
+class HybridRetriever:
+    """Runs dense and lexical retrieval side by side and fuses the two rankings
+
+    `dense_search(query, depth, themes, query_vector)` and
+    `lexical_search(query, depth)` return Candidates; `query_vector` is a
+    precomputed query embedding, or None to let the dense side encode.
+    Each retriever contributes `depth` candidates, so the fused top-k can
+    surface a verse only one of them ranked highly.
+    """
+
+    def __init__(
+        self,
+        dense_search: Callable[[str, int, Optional[List[str]], Any], List[Candidate]],
+        lexical_search: Callable[[str, int], List[Candidate]],
+        method: str = "rrf",
+        rrf_k: int = 60,
+        depth: int = 20,
+        mode_weights: Optional[Dict[str, FusionWeights]] = None,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ):
+        if method not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method '{method}', expected one of {FUSION_METHODS}")
+        self.dense_search = dense_search
+        self.lexical_search = lexical_search
+        self.method = method
+        self.rrf_k = rrf_k
+        self.depth = depth
+        self.mode_weights = mode_weights or dict(DEFAULT_MODE_WEIGHTS)
+        self.executor = executor or ThreadPoolExecutor(max_workers=4, thread_name_prefix="hybrid")
+
+    def weights_for(self, mode: Optional[str]) -> FusionWeights:
+        mode = getattr(mode, "value", mode) or "default"
+        return self.mode_weights.get(mode, self.mode_weights["default"])
+
+    def timed_lexical_search(self, query: str, depth: int) -> List[Candidate]:
+        with metrics.timed("lexical_search"):
+            return self.lexical_search(query, depth)
+
+    def _lexical_query(self, query: str, themes: Optional[List[str]]) -> str:
+        return f"{query} {' '.join(themes)}" if themes else query
+
+    def fuse(self, dense: List[Candidate], lexical: List[Candidate], weights: FusionWeights,
+             k: int) -> List[Tuple[Any, float]]:
+        rankings = [(dense, weights.dense), (lexical, weights.lexical)]
+        if self.method == "rrf":
+            fused = reciprocal_rank_fusion(rankings, self.rrf_k)
+        else:
+            fused = weighted_score_fusion(rankings)
+        payloads = {}
+        for candidates, _ in rankings:
+            for key, payload, _ in candidates:
+                payloads.setdefault(key, payload)
+        ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(payloads[key], score) for key, score in ranked]
+
+    def search(self, query: str, k: int = 3, mode: Optional[str] = None,
+               emotion_themes: Optional[List[str]] = None, query_vector: Any = None) -> List[Tuple[Any, float]]:
+        weights = self.weights_for(mode)
+        depth = max(self.depth, k)
+        dense_future = None
+        if weights.dense > 0:
+            dense_future = self.executor.submit(self.dense_search, query, depth, emotion_themes, query_vector)
+        # Lexical search is sub-millisecond, run it here while the encoder works
+        lexical = self.timed_lexical_search(self._lexical_query(query, emotion_themes), depth) \
+            if weights.lexical > 0 else []
+        dense = dense_future.result() if dense_future else []
+        return self.fuse(dense, lexical, weights, k)
+
+    async def asearch(self, query: str, k: int = 3, mode: Optional[str] = None,
+                      emotion_themes: Optional[List[str]] = None, query_vector: Any = None) -> List[Tuple[Any, float]]:
+        """search() for async handlers: both retrievers run on the pool concurrently"""
+        weights = self.weights_for(mode)
+        depth = max(self.depth, k)
+        loop = asyncio.get_running_loop()
+
+        async def nothing():
+            return []
+
+        dense, lexical = await asyncio.gather(
+            metrics.run_in_executor(loop, self.executor, self.dense_search,
+                                    query, depth, emotion_themes, query_vector)
+            if weights.dense > 0 else nothing(),
+            metrics.run_in_executor(loop, self.executor, self.timed_lexical_search,
+                                    self._lexical_query(query, emotion_themes), depth)
+            if weights.lexical > 0 else nothing(),
+        )
+        with metrics.timed("fuse"):
+            return self.fuse(dense, lexical, weights, k)
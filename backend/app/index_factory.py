@@ -0,0 +1,202 @@
+import os
+from typing import Optional
+
+import numpy as np
+
+from lazy import lazy_import
+
+# Loaded on first use, so importing this module stays cheap
+faiss = lazy_import("faiss")
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+METRICS = ("l2", "cosine")
+STORAGE_TYPES = ("float32", "float16", "int8")
+
+
+def index_config_from_env() -> dict:
+    """Index settings from KRISHNA_INDEX_* / KRISHNA_NPROBE / KRISHNA_EF_SEARCH"""
+    return {
+        "index_type": os.getenv("KRISHNA_INDEX_TYPE", "flat").lower(),
+        "metric": os.getenv("KRISHNA_INDEX_METRIC", "l2").lower(),
+        "storage": os.getenv("KRISHNA_INDEX_STORAGE", "float32").lower(),
+        "nlist": int(os.getenv("KRISHNA_INDEX_NLIST", "0")) or None,
+        "hnsw_m": int(os.getenv("KRISHNA_HNSW_M", "32")),
+        "ef_construction": int(os.getenv("KRISHNA_EF_CONSTRUCTION", "200")),
+        "pq_m": int(os.getenv("KRISHNA_PQ_M", "16")),
+        "nprobe": int(os.getenv("KRISHNA_NPROBE", "8")),
+        "ef_search": int(os.getenv("KRISHNA_EF_SEARCH", "64")),
+    }
+
+
+def build_signature(config: dict) -> dict:
+    """The settings baked into an index at build time (search knobs excluded)"""
+    index_type = config.get("index_type", "flat")
+    keys = {
+        "flat": (),
+        "hnsw": ("hnsw_m", "ef_construction"),
+        "ivf_flat": ("nlist",),
+        "ivf_pq": ("nlist", "pq_m"),
+    }.get(index_type, ())
+    return {
+        "index_type": index_type,
+        "id_map": bool(config.get("id_map", False)),
+        "metric": config.get("metric", "l2"),
+        # PQ codes are already compressed, scalar-quantized storage does not apply
+        "storage": "float32" if index_type == "ivf_pq" else config.get("storage", "float32"),
+        **{key: config.get(key) for key in keys}
+    }
+
+
+def prepare_vectors(vectors: np.ndarray, metric: str = "l2") -> np.ndarray:
+    """float32, C-contiguous and, for cosine, L2-normalized (ingest and query side alike)"""
+    vectors = np.array(vectors, dtype='float32', order='C', ndmin=2)
+    if metric == "cosine":
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def truncate_embeddings(vectors: np.ndarray, dimensions: Optional[int]) -> np.ndarray:
+    """Keep the leading `dimensions` components and re-normalize
+
+    text-embedding-3 models are trained so their prefixes remain usable
+    embeddings, which shrinks 1536-dim vectors at a small quality cost.
+    """
+    vectors = np.asarray(vectors, dtype='float32')
+    if not dimensions or dimensions >= vectors.shape[1]:
+        return vectors
+    truncated = np.ascontiguousarray(vectors[:, :dimensions])
+    faiss.normalize_L2(truncated)
+    return truncated
+
+
+def _pick_nlist(n: int, nlist: Optional[int]) -> int:
+    # FAISS wants ~39 training points per centroid; sqrt(n) is the usual default
+    if not nlist:
+        nlist = int(4 * np.sqrt(n))
+    return max(1, min(nlist, n // 39 or 1))
+
+
+def _pick_pq_m(dimension: int, pq_m: int) -> int:
+    # PQ sub-quantizers must divide the dimension
+    for m in range(min(pq_m, dimension), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+def build_index(
+    embeddings: np.ndarray,
+    index_type: str = "flat",
+    metric: str = "l2",
+    storage: str = "float32",
+    nlist: Optional[int] = None,
+    hnsw_m: int = 32,
+    ef_construction: int = 200,
+    pq_m: int = 16,
+    nprobe: int = 8,
+    ef_search: int = 64,
+    id_map: bool = False,
+    ids: Optional[np.ndarray] = None,
+):
+    """Create, train and fill a FAISS index of the requested type
+
+    metric="cosine" normalizes vectors and searches by inner product; queries
+    must go through prepare_vectors with the same metric. storage="float16"
+    or "int8" keeps vectors scalar-quantized (2x / 4x smaller than float32).
+    id_map=True wraps the index in IndexIDMap2 so vectors keep stable ids
+    (row numbers, or `ids`) across incremental adds and removals.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric '{metric}', expected one of {METRICS}")
+    if storage not in STORAGE_TYPES:
+        raise ValueError(f"Unknown storage '{storage}', expected one of {STORAGE_TYPES}")
+
+    embeddings = prepare_vectors(embeddings, metric)
+    n, dimension = embeddings.shape
+    faiss_metric = faiss.METRIC_INNER_PRODUCT if metric == "cosine" else faiss.METRIC_L2
+    qtype = {
+        "float16": faiss.ScalarQuantizer.QT_fp16,
+        "int8": faiss.ScalarQuantizer.QT_8bit,
+    }.get(storage)
+
+    def coarse_quantizer():
+        return faiss.IndexFlatIP(dimension) if metric == "cosine" else faiss.IndexFlatL2(dimension)
+
+    if index_type == "flat":
+        if qtype is None:
+            index = coarse_quantizer()
+        else:
+            index = faiss.IndexScalarQuantizer(dimension, qtype, faiss_metric)
+    elif index_type == "hnsw":
+        if qtype is None:
+            index = faiss.IndexHNSWFlat(dimension, hnsw_m, faiss_metric)
+        else:
+            index = faiss.IndexHNSWSQ(dimension, qtype, hnsw_m, faiss_metric)
+        index.hnsw.efConstruction = ef_construction
+    elif index_type == "ivf_flat":
+        if qtype is None:
+            index = faiss.IndexIVFFlat(coarse_quantizer(), dimension, _pick_nlist(n, nlist), faiss_metric)
+        else:
+            index = faiss.IndexIVFScalarQuantizer(
+                coarse_quantizer(), dimension, _pick_nlist(n, nlist), qtype, faiss_metric
+            )
+    elif index_type == "ivf_pq":
+        # 8-bit codes need 256 training points per sub-quantizer; shrink for tiny corpora
+        nbits = int(max(1, min(8, np.floor(np.log2(max(n, 2))))))
+        index = faiss.IndexIVFPQ(
+            coarse_quantizer(), dimension, _pick_nlist(n, nlist), _pick_pq_m(dimension, pq_m), nbits, faiss_metric
+        )
+    else:
+        raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+
+    if not index.is_trained:
+        index.train(embeddings)
+    if id_map or ids is not None:
+        index = faiss.IndexIDMap2(index)
+        if ids is None:
+            ids = np.arange(n)
+        index.add_with_ids(embeddings, np.asarray(ids, dtype='int64'))
+    else:
+        index.add(embeddings)
+    set_search_params(index, nprobe=nprobe, ef_search=ef_search)
+    return index
+
+
+def add_vectors(index, vectors: np.ndarray, ids: Optional[np.ndarray] = None, metric: str = "l2"):
+    """Append vectors to a built index, with explicit ids for id-mapped indexes"""
+    vectors = prepare_vectors(vectors, metric)
+    if ids is not None:
+        index.add_with_ids(vectors, np.asarray(ids, dtype='int64'))
+    else:
+        index.add(vectors)
+
+
+def remove_ids(index, ids) -> bool:
+    """Delete vectors by id; False when the index type cannot remove (e.g. HNSW)
+
+    Callers keep a tombstone set for ids that could not be removed and
+    filter them out of search results.
+    """
+    ids = np.asarray(list(ids), dtype='int64')
+    if not len(ids):
+        return True
+    try:
+        index.remove_ids(ids)
+        return True
+    except RuntimeError:
+        return False
+
+
+def set_search_params(index, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """Apply query-time knobs (nprobe for IVF, efSearch for HNSW) where they exist"""
+    if hasattr(index, "id_map"):
+        index = faiss.downcast_index(index.index)
+    ivf = faiss.try_extract_index_ivf(index) if hasattr(faiss, "try_extract_index_ivf") else None
+    if ivf is None and isinstance(index, faiss.IndexIVF):
+        ivf = index
+    if ivf is not None and nprobe:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+
+    hnsw = getattr(index, "hnsw", None)
+    if hnsw is not None and ef_search:
+        hnsw.efSearch = ef_search
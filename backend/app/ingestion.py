@@ -0,0 +1,152 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+SOURCE_PATTERNS = ("*.pdf", "*.txt")
+PAGES_PER_JOB = 25
+
+
+class Page(NamedTuple):
+    source: str
+    number: int  # 1-based page number
+    text: str
+
+
+class Chunk(NamedTuple):
+    text: str
+    metadata: dict  # source file and page range, extended by the chunker
+
+
+def discover_sources(data_dir: str = "data", patterns: Tuple[str, ...] = SOURCE_PATTERNS) -> List[Path]:
+    """All source documents under data_dir, in a stable order"""
+    data_path = Path(data_dir)
+    found = set()
+    for pattern in patterns:
+        found.update(data_path.glob(pattern))
+    return sorted(found, key=lambda p: p.name)
+
+
+def _page_count(path: Path) -> int:
+    if path.suffix.lower() != ".pdf":
+        return 1
+    import PyPDF2
+    with open(path, 'rb') as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def _extract_range(path: str, start: int, end: int) -> List[str]:
+    """Extract pages [start, end) of one document; runs in a worker process"""
+    if not path.lower().endswith(".pdf"):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return [f.read()]
+    import PyPDF2
+    with open(path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        return [(reader.pages[i].extract_text() or "") for i in range(start, end)]
+
+
+def iter_pages(sources: Iterable[Path], workers: Optional[int] = None) -> Iterator[Page]:
+    """Yield pages of every source in order, extracting page ranges in a process pool"""
+    jobs = []
+    for path in sources:
+        count = _page_count(path)
+        for start in range(0, count, PAGES_PER_JOB):
+            jobs.append((path, start, min(start + PAGES_PER_JOB, count)))
+
+    workers = workers or int(os.getenv("KRISHNA_INGEST_WORKERS", "0")) or os.cpu_count() or 1
+    if workers <= 1 or len(jobs) <= 1:
+        results = (_extract_range(str(path), start, end) for path, start, end in jobs)
+        for (path, start, _), texts in zip(jobs, results):
+            for offset, text in enumerate(texts):
+                yield Page(path.name, start + offset + 1, text)
+        return
+
+    # Spawned, not forked: this runs on the init and reindex threads of a
+    # process that already has event loop, FAISS and tokenizer threads
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=context) as pool:
+        results = pool.map(
+            _extract_range,
+            [str(path) for path, _, _ in jobs],
+            [start for _, start, _ in jobs],
+            [end for _, _, end in jobs],
+        )
+        for (path, start, _), texts in zip(jobs, results):
+            for offset, text in enumerate(texts):
+                yield Page(path.name, start + offset + 1, text)
+
+
+def iter_paragraphs(pages: Iterable[Page]) -> Iterator[Tuple[str, str, int, int]]:
+    """Stream (paragraph, source, first page, last page) without joining the whole book
+
+    Paragraphs are separated by blank lines; one that runs across a page
+    break is carried over and attributed to both pages.
+    """
+    carry, carry_source, carry_page = "", None, 0
+    for page in pages:
+        if carry_source is not None and page.source != carry_source:
+            if carry:
+                yield carry, carry_source, carry_page, carry_page
+            carry = ""
+        if not carry:
+            carry_page = page.number
+        carry_source = page.source
+
+        paragraphs = (carry + page.text + "\n").split("\n\n")
+        carry = paragraphs.pop()
+        first_page = carry_page
+        for para in paragraphs:
+            yield para, page.source, first_page, page.number
+            first_page = page.number
+        if paragraphs:
+            carry_page = page.number
+
+    if carry:
+        yield carry, carry_source, carry_page, carry_page
+
+
+def chunk_paragraphs(paragraphs: Iterable[Tuple[str, str, int, int]], chunk_size: int = 1000,
+                     min_chunk: int = 100) -> Iterator[Chunk]:
+    """Pack paragraphs into ~chunk_size character chunks with source/page provenance"""
+    parts: List[str] = []
+    length = 0
+    meta = None
+
+    def flush():
+        text = "\n\n".join(parts).strip()
+        if len(text) > min_chunk:
+            return Chunk(text, dict(meta))
+        return None
+
+    for para, source, first_page, last_page in paragraphs:
+        if parts and (length + len(para) >= chunk_size or source != meta["source"]):
+            chunk = flush()
+            if chunk:
+                yield chunk
+            parts, length, meta = [], 0, None
+        if meta is None:
+            meta = {"source": source, "page_start": first_page, "page_end": last_page}
+        parts.append(para)
+        length += len(para) + 2
+        meta["page_end"] = last_page
+
+    if parts:
+        chunk = flush()
+        if chunk:
+            yield chunk
+
+
+def ingest(sources: Iterable[Path], chunk_size: int = 1000, workers: Optional[int] = None,
+           chunker: Optional[Callable[[Iterable[Tuple[str, str, int, int]]], Iterator[Chunk]]] = None
+           ) -> Iterator[Chunk]:
+    """Source documents -> pages -> paragraphs -> chunks, streamed end to end
+
+    `chunker` replaces the character-based chunk_paragraphs, e.g.
+    chunking.VerseChunker(...).chunk.
+    """
+    paragraphs = iter_paragraphs(iter_pages(sources, workers))
+    if chunker is not None:
+        return chunker(paragraphs)
+    return chunk_paragraphs(paragraphs, chunk_size=chunk_size)
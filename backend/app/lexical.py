@@ -0,0 +1,132 @@
+import os
+import re
+import json
+import math
+import heapq
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+INDEX_VERSION = 3
+
+# Latin words/numbers, including Latin-extended letters and the combining
+# marks NFKD splits off transliterated Sanskrit ("karmaṇy", "sthitaprajña"),
+# and Devanagari words (dandas excluded, ZWJ/ZWNJ kept inside words)
+TOKEN = re.compile(
+    r"[a-z0-9\u00C0-\u024F\u1E00-\u1EFF\u0300-\u036F]+|[\u0900-\u0963\u0966-\u097F\u200C\u200D]+"
+)
+# Latin diacritics and the zero-width joiners, dropped from tokens
+FOLDED = re.compile(r"[\u0300-\u036F\u200C\u200D]")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i in is it its me my of on or "
+    "our she so that the their them they this to was we were what when which who will with you "
+    "your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased English and Devanagari terms without stopwords
+
+    Transliterations are folded to plain Latin letters, so "karmaṇy" and
+    "karmany" are the same term.
+    """
+    tokens = []
+    for token in TOKEN.findall(unicodedata.normalize("NFKD", text).lower()):
+        token = FOLDED.sub("", token)
+        if token and token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """Inverted index with BM25 ranking over a fixed list of documents
+
+    Postings are term -> ([doc positions], [term frequencies]) and are saved
+    as JSON next to the source data, keyed by its checksum, so workers load
+    them instead of re-tokenizing the corpus.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self.doc_lengths: List[int] = []
+        self.avg_length = 0.0
+        self.checksum: Optional[str] = None
+
+    @classmethod
+    def build(cls, documents: Iterable[List[str]], checksum: Optional[str] = None, **params) -> "BM25Index":
+        index = cls(**params)
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        for position, tokens in enumerate(documents):
+            index.doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                docs, tfs = postings.setdefault(term, ([], []))
+                docs.append(position)
+                tfs.append(tf)
+        index.postings = postings
+        index.avg_length = sum(index.doc_lengths) / max(len(index.doc_lengths), 1)
+        index.checksum = checksum
+        return index
+
+    @classmethod
+    def load(cls, path: str, checksum: Optional[str]) -> Optional["BM25Index"]:
+        """The saved index, or None if it is missing or was built from other data"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != INDEX_VERSION or checksum is None or data.get("checksum") != checksum:
+            return None
+        index = cls(k1=data["k1"], b=data["b"])
+        index.postings = {term: (docs, tfs) for term, (docs, tfs) in data["postings"].items()}
+        index.doc_lengths = data["doc_lengths"]
+        index.avg_length = sum(index.doc_lengths) / max(len(index.doc_lengths), 1)
+        index.checksum = checksum
+        return index
+
+    def save(self, path: str):
+        # A temp name per writer, so workers saving the same index at once do not clobber each other
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "version": INDEX_VERSION,
+                "checksum": self.checksum,
+                "k1": self.k1,
+                "b": self.b,
+                "doc_lengths": self.doc_lengths,
+                "postings": self.postings,
+            }, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def score(self, query: str) -> Dict[int, float]:
+        """BM25 score of every document containing at least one query term"""
+        n = len(self.doc_lengths)
+        lengths, avg_length = self.doc_lengths, self.avg_length or 1.0
+        k1, b = self.k1, self.b
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            docs, tfs = posting
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc, tf in zip(docs, tfs):
+                norm = k1 * (1 - b + b * lengths[doc] / avg_length)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query: str, limit: Optional[int] = 10,
+               offset: int = 0) -> Tuple[int, List[Tuple[int, float]]]:
+        """(total matches, [(doc position, score)]) for one page of the ranking, or all of it with limit=None"""
+        scores = self.score(query)
+        if limit is None:
+            return len(scores), sorted(scores.items(), key=lambda item: (-item[1], item[0]))[offset:]
+        # Only the requested page's worth of results is ever sorted
+        top = heapq.nlargest(offset + limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return len(scores), top[offset:]
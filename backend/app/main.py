@@ -1,17 +1,26 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
 import os
+import multiprocessing
+import secrets
+import threading
 from dotenv import load_dotenv
 
 from models import (
     ChatRequest, StudyRequest, ChatResponse, StudyResponse, 
-    Verse, LanguageEnum, ModeEnum
+    LanguageEnum, ModeEnum
 )
 from database import GitaDatabase
 from embeddings import EmbeddingManager
+from hybrid import HybridRetriever, mode_weights_from_env
 from emotion_classifier import EmotionClassifier
+from emotion_embedding import EmbeddingEmotionClassifier
 from utils import KrishnaResponseGenerator
+from startup import StartupProgress
+from metrics import FALLBACKS, instrument_app, registry
 
 load_dotenv()
 
@@ -27,16 +36,139 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize components
+# Stage latency histograms and counters on GET /metrics; KRISHNA_TIMING_HEADER=1 adds Server-Timing
+instrument_app(app, timing_header=os.getenv("KRISHNA_TIMING_HEADER", "").lower() in ("1", "true", "yes"))
+
+# Initialize components; the verse data and BM25 index are small and load here
 db = GitaDatabase()
-embedding_manager = EmbeddingManager(use_openai=bool(os.getenv("OPENAI_API_KEY")))
 emotion_classifier = EmotionClassifier()
-response_generator = KrishnaResponseGenerator()
+# KRISHNA_RESPONSE_SEED makes template answers reproducible per request
+response_seed = os.getenv("KRISHNA_RESPONSE_SEED")
+response_generator = KrishnaResponseGenerator(seed=int(response_seed) if response_seed else None)
+response_generator.precompute(db.get_all_verses())
+
+BUNDLE_DIR = os.getenv("EMBEDDING_BUNDLE_DIR", "storage/gita_bundle")
+SHARED_INDEX = os.getenv("KRISHNA_SHARED_INDEX", "").lower() in ("1", "true", "yes")
+
+# The embedding model, index and emotion prototypes load after the server
+# starts listening (see initialize); /readyz reports per-stage progress
+embedding_manager: Optional[EmbeddingManager] = None
+emotion_embedder: Optional[EmbeddingEmotionClassifier] = None
+startup = StartupProgress(["embedding_model", "bundle", "embedding", "emotion_prototypes"])
+
+def load_embeddings(manager: EmbeddingManager):
+    """Load the prebuilt embedding bundle (see setup_embeddings.py); rebuild only if stale"""
+    with startup.stage("bundle"):
+        fresh = manager.load_bundle(BUNDLE_DIR, db.checksum(), mmap=SHARED_INDEX)
+        stale = not fresh and manager.load_bundle(BUNDLE_DIR, mmap=SHARED_INDEX)
+    if fresh:
+        return
+    verses = db.get_all_verses()
+    with startup.stage("embedding"):
+        manager.bulk_embedder.on_progress = lambda done, total: startup.update(
+            "embedding", batches_done=done, batches_total=total
+        )
+        if stale:
+            # Verse data changed since the bundle was built: embed only the differences
+            summary = manager.update_verses(verses)
+            print(f"Embedding bundle updated: +{summary['added']} / -{summary['removed']} verses")
+        elif verses:
+            print("Embedding bundle missing or stale, re-embedding verses...")
+            manager.add_verses(verses)
+    if verses:
+        try:
+            manager.save_bundle(BUNDLE_DIR, db.checksum())
+        except OSError as e:
+            print(f"Could not save embedding bundle: {e}")
+
+def initialize():
+    """Build the dense retrieval side, publishing it only once it is complete"""
+    global embedding_manager, emotion_embedder
+    if not startup.begin():
+        return
+    for _ in startup.attempts():
+        try:
+            with startup.stage("embedding_model"):
+                manager = EmbeddingManager(use_openai=bool(os.getenv("OPENAI_API_KEY")))
+            load_embeddings(manager)
+            
+            # Emotion prototypes and theme vectors, encoded once so emotion mode reuses the query embedding
+            embedder = EmbeddingEmotionClassifier(
+                manager.get_embeddings,
+                emotion_classifier.emotion_keywords,
+                emotion_classifier.emotion_verse_mapping,
+                min_similarity=float(os.getenv("KRISHNA_EMOTION_MIN_SIMILARITY", "0.3")),
+                boost=float(os.getenv("KRISHNA_THEME_BOOST", "0.3")),
+                keyword_detector=emotion_classifier.detect_emotion
+            )
+            try:
+                with startup.stage("emotion_prototypes"):
+                    embedder.build()
+            except Exception as e:
+                print(f"Emotion prototypes unavailable, using keyword detection: {e}")
+            
+            embedding_manager, emotion_embedder = manager, embedder
+            startup.finish()
+            break
+        except Exception as e:
+            print(f"Failed to initialize embeddings: {e}")
+            startup.fail(e)
 
-# Load verses into embedding manager
-verses_data = [verse.dict() for verse in db.get_all_verses()]
-if verses_data:
-    embedding_manager.add_verses(verses_data)
+def cache_lookups():
+    cache = embedding_manager.query_cache
+    return {("query", "hit"): cache.hits, ("query", "miss"): cache.misses}
+
+registry.callback_counter("krishna_cache_lookups_total", "Query cache lookups", ("cache", "result"), cache_lookups)
+
+# KRISHNA_EAGER_INIT=1 (set by gunicorn.conf.py with preload_app) loads
+# everything at import, in the master, so forked workers share it
+# Spawned ingestion workers re-import this module; only the parent process initializes
+if os.getenv("KRISHNA_EAGER_INIT", "").lower() in ("1", "true", "yes") \
+        and multiprocessing.parent_process() is None:
+    initialize()
+
+@app.on_event("startup")
+async def start_background_init():
+    if not startup.begun:
+        threading.Thread(target=initialize, name="krishna-init", daemon=True).start()
+
+def dense_candidates(query: str, depth: int, themes: Optional[List[str]], query_vector=None):
+    if query_vector is not None:
+        results = embedding_manager.search_vector(query_vector, k=depth)
+    else:
+        results = embedding_manager.search(query, k=depth, emotion_themes=themes)
+    # L2 distances rank ascending, cosine similarities descending
+    sign = -1.0 if embedding_manager.index_config["metric"] == "l2" else 1.0
+    candidates = []
+    for key, score in results:
+        verse = db.get_verse_by_reference(*key)
+        if verse is not None:
+            candidates.append((key, verse, sign * score))
+    return candidates
+
+def lexical_candidates(query: str, depth: int):
+    _, hits = db.search_verses_scored(query, limit=depth)
+    return [(verse.key, verse, score) for verse, score in hits]
+
+# Dense + BM25 retrieval fused per mode (KRISHNA_FUSION=rrf|weighted, KRISHNA_HYBRID_WEIGHTS)
+retriever = HybridRetriever(
+    dense_candidates,
+    lexical_candidates,
+    method=os.getenv("KRISHNA_FUSION", "rrf").lower(),
+    rrf_k=int(os.getenv("KRISHNA_RRF_K", "60")),
+    depth=int(os.getenv("KRISHNA_HYBRID_DEPTH", "20")),
+    mode_weights=mode_weights_from_env()
+)
+
+def reindex_verses() -> dict:
+    """Reload the verse JSON and apply only the differences to the index and bundle"""
+    if embedding_manager is None:
+        raise HTTPException(status_code=503, detail="Krishna is still initializing")
+    db.load_data()
+    response_generator.precompute(db.get_all_verses())
+    summary = embedding_manager.update_verses(db.get_all_verses())
+    embedding_manager.save_bundle(BUNDLE_DIR, db.checksum())
+    return summary
 
 @app.get("/")
 async def root():
@@ -44,28 +176,44 @@ async def root():
 
 @app.post("/ask", response_model=ChatResponse)
 async def ask_krishna(request: ChatRequest):
+    if embedding_manager is None:
+        raise HTTPException(status_code=503, detail="Krishna is still initializing")
     try:
         detected_emotion = None
         search_themes = None
+        query_vector = None
         
         # Emotion detection and theme mapping
-        if request.mode == ModeEnum.emotion:
+        if request.mode == ModeEnum.emotion and emotion_embedder and emotion_embedder.ready:
+            # One encoder pass: the query embedding is classified, then moved
+            # toward the emotion's theme vectors and used for the dense search
+            query_vector = await run_in_threadpool(embedding_manager.encode_query, request.query)
+            detected_emotion = emotion_embedder.detect(request.query, query_vector)
+            if detected_emotion:
+                search_themes = emotion_classifier.get_relevant_themes(detected_emotion)
+                query_vector = emotion_embedder.boost(query_vector, detected_emotion)
+        elif request.mode == ModeEnum.emotion:
+            FALLBACKS.inc(kind="keyword_emotion")
             detected_emotion = emotion_classifier.detect_emotion(request.query)
             if detected_emotion:
                 search_themes = emotion_classifier.get_relevant_themes(detected_emotion)
         
-        # Search for relevant verses
-        search_results = embedding_manager.search(
+        # Search for relevant verses: dense and keyword retrieval run concurrently
+        # off the event loop and are fused with the weights for this mode
+        search_results = await retriever.asearch(
             request.query, 
             k=1, 
-            emotion_themes=search_themes
+            mode=request.mode,
+            emotion_themes=search_themes,
+            query_vector=query_vector
         )
         
         if not search_results:
             raise HTTPException(status_code=404, detail="No relevant verses found")
         
-        best_verse_data, similarity_score = search_results[0]
-        verse = Verse(**best_verse_data)
+        best_verse, similarity_score = search_results[0]
+        # Verse records are views into the store; build the model for the response only
+        verse = best_verse.to_model()
         
         # Generate Krishna's response
         krishna_response = response_generator.generate_response(
@@ -123,7 +271,7 @@ async def study_mode(request: StudyRequest):
                 query_type = f"Verse {request.verse}"
         
         return StudyResponse(
-            verses=verses,
+            verses=[verse.to_model() for verse in verses],
             total_found=len(verses),
             query_type=query_type,
             language=request.language.value
@@ -132,12 +280,57 @@ async def study_mode(request: StudyRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.get("/search")
+async def search_verses(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    """Keyword search (BM25) over verse translations and themes, paginated"""
+    total, hits = db.search_verses_scored(q, limit=limit, offset=offset)
+    return {
+        "query": q,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "results": [{"verse": verse.to_model(), "score": round(score, 4)} for verse, score in hits]
+    }
+
+@app.post("/admin/reindex")
+async def reindex(x_admin_token: Optional[str] = Header(None)):
+    admin_token = os.getenv("KRISHNA_ADMIN_TOKEN")
+    if not admin_token or not secrets.compare_digest((x_admin_token or "").encode(), admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    return await run_in_threadpool(reindex_verses)
+
+@app.get("/livez")
+async def liveness():
+    """The process is up, even while the embeddings are still loading
+
+    503 once initialization has failed for good, so the process is restarted.
+    """
+    if startup.failed:
+        return JSONResponse(status_code=503, content={"status": "failed", "error": startup.error})
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readiness():
+    """200 once /ask can be served, else 503 with per-stage startup progress"""
+    report = startup.report()
+    if embedding_manager is None:
+        return JSONResponse(status_code=503, content=report)
+    return report
+
 @app.get("/health")
 async def health_check():
+    ready = embedding_manager is not None
     return {
-        "status": "healthy",
+        "status": "healthy" if ready else ("failed" if startup.failed else "initializing"),
         "total_verses": len(db.get_all_verses()),
-        "embedding_model": embedding_manager.model_name
+        "embedding_model": embedding_manager.model_name if ready else None,
+        "query_cache": embedding_manager.query_cache.stats() if ready else None,
+        "startup": startup.report(),
+        "metrics": registry.snapshot()
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,274 @@
+import time
+import bisect
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Seconds; spans a cached lookup (~0.1 ms) up to a slow LLM completion
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+LabelValues = Tuple[str, ...]
+
+# Stage timings of the request being handled, for the Server-Timing header
+_request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter, one series per label combination"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        return self.values.get(tuple(str(labels.get(name, "")) for name in self.label_names), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self.values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value:g}" for key, value in items]
+
+
+class CallbackCounter(Counter):
+    """Counter whose values are read at scrape time, for components that already count (caches)"""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str], read: Callable[[], Dict[LabelValues, float]]):
+        super().__init__(name, help, labels)
+        self.read = read
+
+    def samples(self) -> List[str]:
+        try:
+            self.values = dict(self.read())
+        except Exception:
+            # A component that is not initialized yet has nothing to report
+            self.values = {}
+        return super().samples()
+
+
+class Histogram:
+    """Prometheus histogram plus a sliding window of recent observations
+
+    The cumulative buckets aggregate across workers on the Prometheus side;
+    the window gives the local p50/p95/p99 shown by `snapshot()`.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS, window: int = 2048):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self.window = window
+        self.series: Dict[LabelValues, dict] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = {
+                    "counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0,
+                    "recent": deque(maxlen=self.window)
+                }
+            series["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+            series["count"] += 1
+            series["recent"].append(value)
+
+    def percentiles(self, **labels) -> Dict[str, float]:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            recent = sorted(self.series[key]["recent"]) if key in self.series else []
+        if not recent:
+            return {}
+        return {f"p{int(q * 100)}": recent[min(len(recent) - 1, int(q * len(recent)))] for q in QUANTILES}
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = sorted((key, list(s["counts"]), s["sum"], s["count"]) for key, s in self.series.items())
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket_labels = _format_labels(self.label_names, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {total:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named counters and histograms rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            # Both apps and the shared modules ask for the same metric by name
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def callback_counter(self, name: str, help: str, labels: Iterable[str],
+                         read: Callable[[], Dict[LabelValues, float]]) -> CallbackCounter:
+        metric = CallbackCounter(name, help, labels, read)
+        with self._lock:
+            self.metrics[name] = metric
+        return metric
+
+    def histogram(self, name: str, help: str, labels: Iterable[str] = (), **kwargs) -> Histogram:
+        return self._register(Histogram(name, help, labels, **kwargs))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """Stage percentiles and counter totals as JSON, for /health"""
+        result = {}
+        for metric in list(self.metrics.values()):
+            if isinstance(metric, Histogram):
+                result[metric.name] = {
+                    "/".join(key) or "all": {"count": series["count"], **metric.percentiles(
+                        **dict(zip(metric.label_names, key)))}
+                    for key, series in list(metric.series.items())
+                }
+            elif not isinstance(metric, CallbackCounter):
+                result[metric.name] = sum(metric.values.values())
+        return result
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "krishna_stage_seconds", "Time spent per RAG pipeline stage", labels=("stage",)
+)
+REQUESTS = registry.counter(
+    "krishna_requests_total", "HTTP requests by route and status", labels=("method", "route", "status")
+)
+REQUEST_SECONDS = registry.histogram(
+    "krishna_request_seconds", "HTTP request latency by route", labels=("method", "route")
+)
+FALLBACKS = registry.counter(
+    "krishna_fallbacks_total", "Responses served by a fallback path", labels=("kind",)
+)
+OPENAI_ERRORS = registry.counter(
+    "krishna_openai_errors_total", "Failed OpenAI calls", labels=("operation", "error")
+)
+OPENAI_TOKENS = registry.counter(
+    "krishna_openai_tokens_total", "Tokens reported by OpenAI usage", labels=("operation", "kind")
+)
+
+
+def record_stage(name: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage: str):
+    """Time a block (sync, or spanning awaits) as one pipeline stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def record_usage(operation: str, response):
+    """Add the token counts of an OpenAI response, if it reports usage"""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        tokens = getattr(usage, kind, None)
+        if tokens:
+            OPENAI_TOKENS.inc(tokens, operation=operation, kind=kind.replace("_tokens", ""))
+
+
+def record_openai_error(operation: str, error: Exception):
+    OPENAI_ERRORS.inc(operation=operation, error=error.__class__.__name__)
+
+
+def run_in_executor(loop, executor, func, *args):
+    """loop.run_in_executor that keeps the request's context, so stage timings reach its header"""
+    context = contextvars.copy_context()
+    return loop.run_in_executor(executor, context.run, func, *args)
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+
+def instrument_app(app, timing_header: bool = False):
+    """Count and time every request; with timing_header, add a Server-Timing stage breakdown"""
+    from fastapi import Request
+    from fastapi.responses import PlainTextResponse
+
+    @app.middleware("http")
+    async def metrics_middleware(request: Request, call_next):
+        timings: Dict[str, float] = {}
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            _request_timings.reset(token)
+            # Route templates, not raw paths, keep the series count bounded
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            elapsed = time.perf_counter() - started
+            REQUESTS.inc(method=request.method, route=route, status=status)
+            REQUEST_SECONDS.observe(elapsed, method=request.method, route=route)
+        if timing_header:
+            # Streaming bodies are still running here; only stages so far are included
+            response.headers["Server-Timing"] = server_timing({**timings, "total": elapsed})
+        return response
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+    return app
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from typing import Optional, List
 from enum import Enum
+from emotion_detector import detect_emotion
 
 class ModeEnum(str, Enum):
     default = "default"
@@ -52,26 +53,4 @@ class EmotionDetector:
     
     @staticmethod
     def detect_emotion(text: str) -> Optional[str]:
-        emotion_keywords = {
-            "sadness": ["sad", "depressed", "grief", "sorrow", "crying", "lost", "lonely"],
-            "anger": ["angry", "furious", "rage", "hate", "annoyed", "frustrated", "mad"],
-            "fear": ["afraid", "scared", "anxious", "worry", "panic", "nervous"],
-            "confusion": ["confused", "lost", "don't understand", "unclear", "bewildered"],
-            "guilt": ["guilty", "shame", "regret", "sorry", "fault"],
-            "love": ["love", "care", "devotion", "heart", "compassion"],
-            "stress": ["stressed", "overwhelmed", "pressure", "burden", "exhausted"],
-            "doubt": ["doubt", "uncertain", "question", "unsure", "skeptical"],
-            "joy": ["happy", "joyful", "excited", "grateful", "blessed", "content"]
-        }
-        
-        text_lower = text.lower()
-        emotion_scores = {}
-        
-        for emotion, keywords in emotion_keywords.items():
-            score = sum(1 for keyword in keywords if keyword in text_lower)
-            if score > 0:
-                emotion_scores[emotion] = score
-        
-        if emotion_scores:
-            return max(emotion_scores.items(), key=lambda x: x[1])[0]
-        return None
\ No newline at end of file
+        return detect_emotion(text)
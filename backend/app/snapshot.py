@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from lazy import lazy_import
+
+# Loaded on first use, so importing this module stays cheap
+faiss = lazy_import("faiss")
+
+SNAPSHOT_VERSION = 4
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_digests(paths: List[Path]) -> Dict[str, str]:
+    """Per-document content hashes, used to find new/changed/removed sources"""
+    return {path.name: hash_file(path) for path in paths}
+
+
+def hash_sources(paths: List[Path], extra: str = "", digests: Optional[Dict[str, str]] = None) -> str:
+    """Content hash of the source documents (plus any build settings in `extra`)"""
+    digests = digests or source_digests(paths)
+    digest = hashlib.sha256()
+    digest.update(f"v{SNAPSHOT_VERSION}|{extra}".encode("utf-8"))
+    for name in sorted(digests):
+        digest.update(f"{name}:{digests[name]}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _save_array(path: Path, array: np.ndarray):
+    # np.save appends ".npy" to bare paths, so hand it an open file
+    with open(path, 'wb') as f:
+        np.save(f, array)
+
+
+def write_atomic(path: Path, writer):
+    """writer(temp path) to a temp file unique to this call, then rename it over path
+
+    Concurrent builders of the same artifact never share a temp file; the
+    last rename wins.
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    try:
+        writer(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
+
+
+def read_index(path: str, mmap: bool = False):
+    """Read a FAISS index, memory-mapping its storage where the index type supports it"""
+    if mmap:
+        flags = getattr(faiss, "IO_FLAG_MMAP", 0) | getattr(faiss, "IO_FLAG_READ_ONLY", 0)
+        try:
+            return faiss.read_index(path, flags)
+        except RuntimeError:
+            pass  # index type cannot be mapped, read it normally
+    return faiss.read_index(path)
+
+
+class MappedChunks(Sequence):
+    """Read-only chunk list backed by a memory-mapped UTF-8 blob plus offsets
+
+    Pages live in the OS page cache, so every worker mapping the same file
+    shares one physical copy instead of holding its own list of strings.
+    """
+
+    def __init__(self, data_path: Path, offsets_path: Path):
+        self._offsets = np.load(offsets_path, mmap_mode='r')
+        if os.path.getsize(data_path):
+            self._data = np.memmap(data_path, dtype=np.uint8, mode='r')
+        else:
+            self._data = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return max(len(self._offsets) - 1, 0)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("chunk index out of range")
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return bytes(self._data[start:end]).decode('utf-8')
+
+
+def _encode_chunks(chunks: List[str]):
+    """Pack chunk texts into one UTF-8 blob with start offsets (n + 1 entries)"""
+    encoded = [chunk.encode('utf-8') for chunk in chunks]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return b"".join(encoded), offsets
+
+
+class CorpusSnapshot:
+    """On-disk snapshot of chunks, embeddings and FAISS index for one corpus"""
+
+    MANIFEST = "manifest.json"
+    CHUNKS = "chunks.bin"
+    CHUNK_OFFSETS = "chunk_offsets.npy"
+    CHUNK_METADATA = "chunk_metadata.json"
+    EMBEDDINGS = "embeddings.npy"
+    INDEX = "index.faiss"
+
+    def __init__(self, directory: str = "storage/snapshot", mmap: bool = False):
+        self.directory = Path(directory)
+        self.mmap = mmap
+        self.manifest = {}
+        self.chunks: Sequence[str] = []
+        self.chunk_metadata: List[dict] = []
+        self.embeddings: Optional[np.ndarray] = None
+        self.index = None
+
+    def read_manifest(self) -> Optional[dict]:
+        try:
+            with open(self.directory / self.MANIFEST, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def is_valid(self, source_hash: Optional[str], model_id: str) -> bool:
+        manifest = self.read_manifest()
+        return bool(
+            manifest
+            and manifest.get("version") == SNAPSHOT_VERSION
+            and (source_hash is None or manifest.get("source_hash") == source_hash)
+            and manifest.get("embedding_model") == model_id
+        )
+
+    def load(self, source_hash: Optional[str], model_id: str) -> bool:
+        """Load the snapshot if it was built from the same sources and model
+
+        source_hash=None accepts a snapshot of older sources (for incremental updates).
+        """
+        if not self.is_valid(source_hash, model_id):
+            return False
+        try:
+            chunks = MappedChunks(self.directory / self.CHUNKS, self.directory / self.CHUNK_OFFSETS)
+            self.chunks = chunks if self.mmap else list(chunks)
+            with open(self.directory / self.CHUNK_METADATA, 'r', encoding='utf-8') as f:
+                self.chunk_metadata = json.load(f)
+            self.embeddings = np.load(self.directory / self.EMBEDDINGS, mmap_mode='r' if self.mmap else None)
+            self.index = read_index(str(self.directory / self.INDEX), mmap=self.mmap)
+        except Exception as e:
+            print(f"⚠️ Snapshot unreadable, rebuilding: {e}")
+            return False
+
+        self.manifest = self.read_manifest()
+        # Removed chunks stay in the chunk store as empty strings, so the index may be smaller
+        if self.index.ntotal > len(self.chunks):
+            print("⚠️ Snapshot index/chunk count mismatch, rebuilding")
+            return False
+        return True
+
+    def save(self, chunks: List[str], embeddings: np.ndarray, index, source_hash: str, model_id: str,
+             index_config: Optional[dict] = None, chunk_metadata: Optional[List[dict]] = None,
+             extra: Optional[dict] = None):
+        """Write all artifacts, then the manifest last so partial writes never validate
+
+        Several workers may build and save the same corpus at once. Each
+        writes its own temp files, and a save finds the same snapshot
+        (sources, model, index and chunk count) already published by another
+        worker is skipped.
+        """
+        manifest = {
+            "version": SNAPSHOT_VERSION,
+            "source_hash": source_hash,
+            "embedding_model": model_id,
+            "dimension": int(embeddings.shape[1]),
+            "chunks": len(chunks),
+            "index": index_config or {"index_type": "flat"},
+            **(extra or {}),
+        }
+        self.chunks = chunks
+        self.chunk_metadata = chunk_metadata or [{} for _ in chunks]
+        self.embeddings = embeddings
+        self.index = index
+
+        published = self.read_manifest()
+        if published and {key: value for key, value in published.items() if key != "created"} == \
+                json.loads(json.dumps(manifest)):
+            self.manifest = published
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        try:
+            (self.directory / self.MANIFEST).unlink()
+        except FileNotFoundError:
+            pass
+
+        blob, offsets = _encode_chunks(chunks)
+        self._write_atomic(self.CHUNKS, lambda p: p.write_bytes(blob))
+        self._write_atomic(self.CHUNK_OFFSETS, lambda p: _save_array(p, offsets))
+        self._write_atomic(self.CHUNK_METADATA,
+                           lambda p: p.write_text(json.dumps(self.chunk_metadata), encoding='utf-8'))
+        self._write_atomic(self.EMBEDDINGS, lambda p: _save_array(p, embeddings.astype('float32')))
+        self._write_atomic(self.INDEX, lambda p: faiss.write_index(index, str(p)))
+
+        self.manifest = {**manifest, "created": datetime.now().isoformat()}
+        self._write_atomic(self.MANIFEST, lambda p: p.write_text(json.dumps(self.manifest, indent=2), encoding='utf-8'))
+
+    def _write_atomic(self, name: str, writer):
+        write_atomic(self.directory / name, writer)
@@ -0,0 +1,87 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+
+
+class StartupProgress:
+    """Per-stage progress of the background initialization, for readiness probes
+
+    A failed initialization is retried up to `retries` times with doubling
+    backoff (KRISHNA_INIT_RETRIES, KRISHNA_INIT_BACKOFF seconds). Once the
+    retries are used up `failed` is set, and liveness probes report it so
+    the orchestrator restarts the process.
+    """
+
+    def __init__(self, stages: Iterable[str], retries: Optional[int] = None, backoff: Optional[float] = None):
+        self.started = time.time()
+        self.begun = False
+        self.ready = False
+        self.failed = False
+        self.attempt = 0
+        self.error: Optional[str] = None
+        self.retries = int(os.getenv("KRISHNA_INIT_RETRIES", "5")) if retries is None else retries
+        self.backoff = float(os.getenv("KRISHNA_INIT_BACKOFF", "2")) if backoff is None else backoff
+        self.stages = {name: {"status": "pending"} for name in stages}
+        self._lock = threading.Lock()
+
+    def begin(self) -> bool:
+        """Claim the initialization; False if it is already running or done"""
+        with self._lock:
+            if self.begun:
+                return False
+            self.begun = True
+            return True
+
+    def attempts(self, max_backoff: float = 60.0) -> Iterator[int]:
+        """Attempt numbers for the init loop, sleeping between them; break out on success"""
+        delay = self.backoff
+        for attempt in range(1, self.retries + 2):
+            if attempt > 1:
+                print(f"Retrying initialization in {delay:.0f}s (attempt {attempt} of {self.retries + 1})")
+                time.sleep(delay)
+                delay = min(delay * 2, max_backoff)
+            self.attempt = attempt
+            yield attempt
+        with self._lock:
+            self.failed = True
+
+    def update(self, name: str, **fields):
+        with self._lock:
+            self.stages.setdefault(name, {"status": "pending"}).update(fields)
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        self.update(name, status="running")
+        try:
+            yield
+        except Exception as e:
+            self.update(name, status="failed", error=str(e), seconds=round(time.perf_counter() - started, 3))
+            raise
+        self.update(name, status="done", seconds=round(time.perf_counter() - started, 3))
+
+    def finish(self):
+        """Mark initialization complete; stages that never ran are reported as skipped"""
+        with self._lock:
+            for stage in self.stages.values():
+                if stage["status"] == "pending":
+                    stage["status"] = "skipped"
+            self.ready = True
+            self.error = None
+
+    def fail(self, error: Exception):
+        with self._lock:
+            self.error = f"{error.__class__.__name__}: {error}"
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "failed": self.failed,
+                "attempt": self.attempt,
+                "error": self.error,
+                "uptime_seconds": round(time.time() - self.started, 1),
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+            }
@@ -1,9 +1,20 @@
 import random
-from typing import List
+import zlib
+from typing import Dict, Iterable, Optional, Tuple
 from models import Verse, LanguageEnum
 
+EMOTION_RESPONSES = {
+    "sadness": "I understand your sorrow. Remember that joy and sorrow are temporary states.",
+    "anger": "Your anger shows your passion, but let it not cloud your judgment.",
+    "fear": "Fear arises from attachment. Trust in the divine protection that surrounds you.",
+    "confusion": "In moments of doubt, seek the wisdom that lies within your heart.",
+    "guilt": "Past actions cannot be changed, but your present choices shape your future.",
+    "stress": "When overwhelmed, remember that you need only focus on your dharma.",
+    "doubt": "Doubt is natural, but faith in the divine truth will guide you forward."
+}
+
 class KrishnaResponseGenerator:
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
         self.greeting_phrases = [
             "Dear soul,", "Beloved devotee,", "O seeker of truth,", 
             "My child,", "Noble one,", "Dear friend,"
@@ -23,33 +34,61 @@ class KrishnaResponseGenerator:
             "Surrender your worries to the divine.",
             "May you find clarity in your journey."
         ]
-    
-    def generate_response(self, query: str, verse: Verse, detected_emotion: str = None, language: LanguageEnum = LanguageEnum.english) -> str:
-        greeting = random.choice(self.greeting_phrases)
-        connector = random.choice(self.wisdom_connectors)
-        closing = random.choice(self.closing_phrases)
         
-        # Get verse text based on language
-        verse_text = self.get_verse_text(verse, language)
+        # With a seed, phrase choices derive from the request itself, so the
+        # same question always gets the same answer (tests, demos, caching)
+        self.seed = seed
         
-        # Emotion-specific responses
-        emotion_context = ""
-        if detected_emotion:
-            emotion_responses = {
-                "sadness": "I understand your sorrow. Remember that joy and sorrow are temporary states.",
-                "anger": "Your anger shows your passion, but let it not cloud your judgment.",
-                "fear": "Fear arises from attachment. Trust in the divine protection that surrounds you.",
-                "confusion": "In moments of doubt, seek the wisdom that lies within your heart.",
-                "guilt": "Past actions cannot be changed, but your present choices shape your future.",
-                "stress": "When overwhelmed, remember that you need only focus on your dharma.",
-                "doubt": "Doubt is natural, but faith in the divine truth will guide you forward."
-            }
-            emotion_context = emotion_responses.get(detected_emotion, "")
+        # "greeting emotion connector " for every combination, and " closing"
+        self.prefixes: Dict[Tuple[int, Optional[str], int], str] = {}
+        for g, greeting in enumerate(self.greeting_phrases):
+            for emotion in [None, *EMOTION_RESPONSES]:
+                emotion_context = EMOTION_RESPONSES.get(emotion, "")
+                for c, connector in enumerate(self.wisdom_connectors):
+                    self.prefixes[(g, emotion, c)] = f"{greeting} {emotion_context} {connector} "
+        self.suffixes = [f" {closing}" for closing in self.closing_phrases]
         
-        response = f"{greeting} {emotion_context} {connector} {verse_text} {closing}"
-        return response
+        # Per verse: text by language and the reference string (see precompute)
+        self.verse_texts: Dict[Tuple[int, int], Dict[LanguageEnum, str]] = {}
+        self.references: Dict[Tuple[int, int], str] = {}
+    
+    def precompute(self, verses: Iterable[Verse]):
+        """Build the per-verse lookup tables; call again after the verse data reloads"""
+        verse_texts, references = {}, {}
+        for verse in verses:
+            key = (verse.chapter, verse.verse_number)
+            verse_texts[key] = {language: self._select_text(verse, language) for language in LanguageEnum}
+            references[key] = f"Bhagavad Gita {verse.chapter}.{verse.verse_number}"
+        self.verse_texts, self.references = verse_texts, references
+    
+    def _choices(self, query: str, key: Tuple[int, int], emotion: Optional[str],
+                 language: LanguageEnum) -> Tuple[int, int, int]:
+        sizes = (len(self.greeting_phrases), len(self.wisdom_connectors), len(self.closing_phrases))
+        if self.seed is None:
+            return tuple(random.randrange(size) for size in sizes)
+        digest = zlib.crc32(f"{self.seed}|{query}|{key}|{emotion}|{language}".encode('utf-8'))
+        choices = []
+        for size in sizes:
+            digest, choice = divmod(digest, size)
+            choices.append(choice)
+        return tuple(choices)
+    
+    def generate_response(self, query: str, verse: Verse, detected_emotion: str = None, language: LanguageEnum = LanguageEnum.english) -> str:
+        key = (verse.chapter, verse.verse_number)
+        g, c, e = self._choices(query, key, detected_emotion, language)
+        
+        # Table lookups only; emotions without a fragment read like no emotion
+        prefix = self.prefixes[(g, detected_emotion if detected_emotion in EMOTION_RESPONSES else None, c)]
+        return prefix + self.get_verse_text(verse, language) + self.suffixes[e]
     
     def get_verse_text(self, verse: Verse, language: LanguageEnum) -> str:
+        texts = self.verse_texts.get((verse.chapter, verse.verse_number))
+        if texts is not None:
+            return texts[language]
+        return self._select_text(verse, language)
+    
+    @staticmethod
+    def _select_text(verse: Verse, language: LanguageEnum) -> str:
         if language == LanguageEnum.hindi:
             return verse.hindi
         elif language == LanguageEnum.sanskrit:
@@ -58,4 +97,7 @@ class KrishnaResponseGenerator:
             return verse.english
     
     def get_reference_string(self, verse: Verse) -> str:
-        return f"Bhagavad Gita {verse.chapter}.{verse.verse_number}"
\ No newline at end of file
+        reference = self.references.get((verse.chapter, verse.verse_number))
+        if reference is not None:
+            return reference
+        return f"Bhagavad Gita {verse.chapter}.{verse.verse_number}"
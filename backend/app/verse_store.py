@@ -0,0 +1,131 @@
+import sys
+from array import array
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, overload
+
+from models import Verse
+
+VERSE_FIELDS = ("chapter", "verse_number", "sanskrit", "english", "hindi", "themes", "emotions")
+
+
+class VerseRecord:
+    """Read-only view of one row of a VerseStore; holds no verse data itself"""
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: "VerseStore", row: int):
+        self._store = store
+        self._row = row
+
+    @property
+    def chapter(self) -> int:
+        return self._store.chapters[self._row]
+
+    @property
+    def verse_number(self) -> int:
+        return self._store.verse_numbers[self._row]
+
+    @property
+    def sanskrit(self) -> str:
+        return self._store.sanskrit[self._row]
+
+    @property
+    def english(self) -> str:
+        return self._store.english[self._row]
+
+    @property
+    def hindi(self) -> str:
+        return self._store.hindi[self._row]
+
+    @property
+    def themes(self) -> Tuple[str, ...]:
+        return self._store.themes[self._row]
+
+    @property
+    def emotions(self) -> Tuple[str, ...]:
+        return self._store.emotions[self._row]
+
+    @property
+    def key(self) -> Tuple[int, int]:
+        return self.chapter, self.verse_number
+
+    def dict(self) -> dict:
+        return {
+            "chapter": self.chapter,
+            "verse_number": self.verse_number,
+            "sanskrit": self.sanskrit,
+            "english": self.english,
+            "hindi": self.hindi,
+            "themes": list(self.themes),
+            "emotions": list(self.emotions),
+        }
+
+    def to_model(self) -> Verse:
+        """Materialize the pydantic model, only where a response needs it"""
+        return Verse(**self.dict())
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, VerseRecord) and self._store is other._store and self._row == other._row
+
+    def __hash__(self) -> int:
+        return hash((id(self._store), self._row))
+
+    def __repr__(self) -> str:
+        return f"VerseRecord({self.chapter}.{self.verse_number})"
+
+
+class VerseStore(Sequence):
+    """Columnar verse storage: one list (or array) per field, one copy per value
+
+    Themes and emotions come from a small vocabulary, so their strings are
+    interned and the per-verse tuples share them.
+    """
+
+    def __init__(self):
+        self.chapters = array('H')
+        self.verse_numbers = array('H')
+        self.sanskrit: List[str] = []
+        self.english: List[str] = []
+        self.hindi: List[str] = []
+        self.themes: List[Tuple[str, ...]] = []
+        self.emotions: List[Tuple[str, ...]] = []
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "VerseStore":
+        """Columns from raw verse dicts (the JSON rows), without building models"""
+        store = cls()
+        for record in records:
+            missing = [field for field in VERSE_FIELDS if field not in record]
+            if missing:
+                raise ValueError(f"Verse record missing fields: {', '.join(missing)}")
+            store.chapters.append(int(record["chapter"]))
+            store.verse_numbers.append(int(record["verse_number"]))
+            store.sanskrit.append(str(record["sanskrit"]))
+            store.english.append(str(record["english"]))
+            store.hindi.append(str(record["hindi"]))
+            store.themes.append(tuple(sys.intern(str(theme)) for theme in record["themes"]))
+            store.emotions.append(tuple(sys.intern(str(emotion)) for emotion in record["emotions"]))
+        return store
+
+    def __len__(self) -> int:
+        return len(self.chapters)
+
+    @overload
+    def __getitem__(self, row: int) -> VerseRecord: ...
+
+    @overload
+    def __getitem__(self, rows: slice) -> List[VerseRecord]: ...
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [VerseRecord(self, i) for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return VerseRecord(self, row)
+
+    def __iter__(self) -> Iterator[VerseRecord]:
+        return (VerseRecord(self, i) for i in range(len(self)))
+
+    def get(self, row: Optional[int]) -> Optional[VerseRecord]:
+        return None if row is None else VerseRecord(self, row)
@@ -0,0 +1,105 @@
+"""
+Chunking benchmark: legacy character chunks vs the verse-aware token chunker
+
+Reports chunk count and token sizes, how many chunks exceed the encoder's
+input limit (and get silently truncated), how many chunks mix several
+verses, the prompt tokens spent on k retrieved chunks, and chunking
+throughput. Runs on the documents in --data, or a synthetic Gita-style text.
+
+    python benchmarks/bench_chunking.py --data data --max-tokens 256
+    python benchmarks/bench_chunking.py --synthetic 700 --sizes 128 256 384 --overlap 32
+"""
+
+import sys
+import time
+import json
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from ingestion import Page, chunk_paragraphs, discover_sources, iter_pages, iter_paragraphs
+from chunking import VERSE_MARKER, VerseChunker, approximate_tokens
+
+
+def synthetic_pages(verses: int, seed: int = 0):
+    """Verse text plus commentary of varying length, roughly one page per three verses"""
+    rng = np.random.default_rng(seed)
+    words = ("dharma action duty self soul mind detachment devotion knowledge yoga Arjuna "
+             "Krishna peace desire wisdom senses work fruit surrender eternal").split()
+    paragraphs = []
+    for i in range(verses):
+        chapter, verse = 1 + i // 40, 1 + i % 40
+        sentences = [
+            " ".join(rng.choice(words, rng.integers(8, 24))).capitalize() + "."
+            for _ in range(rng.integers(2, 14))
+        ]
+        paragraphs.append(f"Chapter {chapter}, Verse {verse}\n" + " ".join(sentences))
+    for start in range(0, len(paragraphs), 3):
+        yield Page("synthetic.txt", start // 3 + 1, "\n\n".join(paragraphs[start:start + 3]) + "\n\n")
+
+
+def measure(name: str, chunks, seconds: float, text_bytes: int, max_tokens: int, k: int) -> dict:
+    tokens = np.array([approximate_tokens(chunk.text) for chunk in chunks] or [0])
+    mixed = sum(1 for chunk in chunks if len(VERSE_MARKER.findall(chunk.text)) > 1)
+    return {
+        "chunker": name,
+        "chunks": len(chunks),
+        "mean_tokens": round(float(tokens.mean()), 1),
+        "p95_tokens": int(np.percentile(tokens, 95)),
+        "max_tokens": int(tokens.max()),
+        "over_limit_pct": round(100 * float((tokens > max_tokens).mean()), 1),
+        "mixed_verse_pct": round(100 * mixed / max(len(chunks), 1), 1),
+        "prompt_tokens_at_k": int(k * tokens.mean()),
+        "mb_per_s": round(text_bytes / 1e6 / seconds, 2) if seconds else float("inf"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark document chunkers")
+    parser.add_argument("--data", help="Directory of source documents (PDF/.txt)")
+    parser.add_argument("--synthetic", type=int, default=700, help="Synthetic verse count when --data is not given")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[128, 256, 384], help="Token budgets to try")
+    parser.add_argument("--overlap", type=int, default=32)
+    parser.add_argument("--legacy-size", type=int, default=1000, help="Character size of the legacy chunker")
+    parser.add_argument("--max-tokens", type=int, default=256, help="Encoder input limit (MiniLM: 256)")
+    parser.add_argument("--k", type=int, default=2, help="Chunks placed in each prompt")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    # Extract once so every chunker sees identical paragraphs
+    if args.data:
+        pages = list(iter_pages(discover_sources(args.data)))
+    else:
+        pages = list(synthetic_pages(args.synthetic))
+    paragraphs = list(iter_paragraphs(pages))
+    text_bytes = sum(len(page.text.encode("utf-8")) for page in pages)
+    print(f"Corpus: {len(pages)} pages, {len(paragraphs)} paragraphs, {text_bytes / 1e6:.2f} MB; "
+          f"encoder limit {args.max_tokens} tokens, k={args.k}")
+
+    candidates = [(f"chars={args.legacy_size}", lambda p: chunk_paragraphs(p, chunk_size=args.legacy_size))]
+    for size in args.sizes:
+        chunker = VerseChunker(chunk_tokens=size, overlap_tokens=args.overlap)
+        candidates.append((f"verse/{size}", chunker.chunk))
+
+    results = []
+    print(f"{'chunker':<14}{'chunks':>8}{'mean tok':>10}{'p95 tok':>9}{'max tok':>9}"
+          f"{'>limit %':>10}{'mixed %':>9}{'prompt tok':>12}{'MB/s':>8}")
+    for name, chunk in candidates:
+        started = time.perf_counter()
+        chunks = list(chunk(iter(paragraphs)))
+        row = measure(name, chunks, time.perf_counter() - started, text_bytes, args.max_tokens, args.k)
+        results.append(row)
+        print(f"{name:<14}{row['chunks']:>8}{row['mean_tokens']:>10.1f}{row['p95_tokens']:>9}{row['max_tokens']:>9}"
+              f"{row['over_limit_pct']:>10.1f}{row['mixed_verse_pct']:>9.1f}{row['prompt_tokens_at_k']:>12}"
+              f"{row['mb_per_s']:>8.2f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"pages": len(pages), "max_tokens": args.max_tokens, "k": args.k, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
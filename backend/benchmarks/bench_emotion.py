@@ -0,0 +1,118 @@
+"""
+Emotion detection benchmark: the old per-keyword substring scans vs the
+shared single-pass detector in app/emotion_detector.py
+
+Reports per-query latency and batch throughput for each detector, how often
+they agree, and the disagreements (e.g. "mad" inside "made"). Queries come
+from --queries (one per line) or a generated corpus.
+
+    python benchmarks/bench_emotion.py --n 20000
+    python benchmarks/bench_emotion.py --queries my_queries.txt --show 20
+"""
+
+import sys
+import time
+import json
+import random
+import argparse
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from emotion_detector import EMOTION_KEYWORDS, KeywordEmotionDetector
+
+TEMPLATES = [
+    "I feel {w} about my {t} and I don't know what to do",
+    "Why am I always so {w} when I think about {t}?",
+    "My {t} made me {w} today, how should I act?",
+    "How do I handle {t} without being {w}",
+    "What does the Gita say about {t}?",
+    "I made a decision about my {t} but now I question it",
+    "Lately I am {w}, my {t} is falling apart",
+]
+TOPICS = ["career", "family", "studies", "marriage", "health", "friendship", "duty", "future", "madrasa", "made-up plans"]
+FILLER = ["calm", "busy", "unsure", "ready", "made", "mad", "sadly", "heartfelt", "careless", "worried", "lost"]
+
+
+def legacy_detect(text: str):
+    """The substring scan the backends used before the shared detector"""
+    text_lower = text.lower()
+    emotion_scores = {}
+    for emotion, keywords in EMOTION_KEYWORDS.items():
+        score = sum(1 for keyword in keywords if keyword in text_lower)
+        if score > 0:
+            emotion_scores[emotion] = score
+    if emotion_scores:
+        return max(emotion_scores.items(), key=lambda x: x[1])[0]
+    return None
+
+
+def synthetic_queries(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    words = [word for keywords in EMOTION_KEYWORDS.values() for word in keywords] + FILLER
+    return [rng.choice(TEMPLATES).format(w=rng.choice(words), t=rng.choice(TOPICS)) for _ in range(n)]
+
+
+def bench(name: str, detect, queries) -> dict:
+    latencies = []
+    for query in queries[:2000]:
+        started = time.perf_counter()
+        detect(query)
+        latencies.append((time.perf_counter() - started) * 1e6)
+
+    started = time.perf_counter()
+    results = [detect(query) for query in queries]
+    seconds = time.perf_counter() - started
+    return {
+        "detector": name,
+        "results": results,
+        "p50_us": round(statistics.median(latencies), 2),
+        "p99_us": round(sorted(latencies)[int(len(latencies) * 0.99) - 1], 2),
+        "queries_per_s": round(len(queries) / seconds) if seconds else float("inf"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark emotion detectors")
+    parser.add_argument("--queries", help="File with one query per line")
+    parser.add_argument("--n", type=int, default=20000, help="Generated query count")
+    parser.add_argument("--show", type=int, default=10, help="Disagreements to print")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    if args.queries:
+        with open(args.queries, 'r', encoding='utf-8') as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = synthetic_queries(args.n)
+
+    detector = KeywordEmotionDetector()
+    rows = [
+        bench("substring", legacy_detect, queries),
+        bench("single-pass", detector.detect, queries),
+    ]
+    started = time.perf_counter()
+    detector.detect_batch(queries)
+    batch_seconds = time.perf_counter() - started
+    rows[1]["batch_queries_per_s"] = round(len(queries) / batch_seconds) if batch_seconds else float("inf")
+
+    print(f"{len(queries):,} queries")
+    print(f"{'detector':<14}{'p50 us':>9}{'p99 us':>9}{'queries/s':>12}")
+    for row in rows:
+        print(f"{row['detector']:<14}{row['p50_us']:>9.2f}{row['p99_us']:>9.2f}{row['queries_per_s']:>12,}")
+
+    old, new = rows[0].pop("results"), rows[1].pop("results")
+    disagreements = [(q, a, b) for q, a, b in zip(queries, old, new) if a != b]
+    print(f"Agreement: {100 * (1 - len(disagreements) / len(queries)):.1f}% "
+          f"({len(disagreements):,} differing queries)")
+    for query, a, b in disagreements[:args.show]:
+        print(f"  {a!s:>10} -> {b!s:<10} {query}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"queries": len(queries), "disagreements": len(disagreements), "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Recall/latency benchmark for the FAISS index types in app/index_factory.py
+
+Reports recall@k against the exact flat index, batch QPS and single-query
+p50/p99 latency. Uses the snapshot embeddings when --snapshot is given,
+otherwise a synthetic clustered corpus.
+
+    python benchmarks/bench_index.py --n 20000 --dim 384 --k 5
+    python benchmarks/bench_index.py --snapshot storage/snapshot --types flat hnsw
+"""
+
+import sys
+import time
+import json
+import argparse
+from pathlib import Path
+
+import numpy as np
+import faiss
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from index_factory import INDEX_TYPES, METRICS, STORAGE_TYPES, build_index, prepare_vectors
+
+
+def synthetic_corpus(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, closer to real sentence embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(n // 100, 1), dim))
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.3 * rng.normal(size=(n, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype('float32')
+
+
+def recall_at_k(truth: np.ndarray, found: np.ndarray) -> float:
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / truth.size
+
+
+def bench(index, queries: np.ndarray, k: int) -> dict:
+    started = time.perf_counter()
+    _, found = index.search(queries, k)
+    batch_seconds = time.perf_counter() - started
+
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "found": found,
+        "qps": len(queries) / batch_seconds if batch_seconds else float("inf"),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index types")
+    parser.add_argument("--n", type=int, default=20000, help="Synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=384, help="Synthetic embedding dimension")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument("--metric", default="l2", choices=METRICS)
+    parser.add_argument("--storage", default="float32", choices=STORAGE_TYPES)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--snapshot", help="Benchmark on a snapshot directory's embeddings.npy")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        corpus = np.load(Path(args.snapshot) / "embeddings.npy").astype('float32')
+    else:
+        corpus = synthetic_corpus(args.n, args.dim)
+
+    rng = np.random.default_rng(1)
+    queries = corpus[rng.integers(0, len(corpus), args.queries)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype('float32')
+    queries = prepare_vectors(queries, args.metric)
+    k = min(args.k, len(corpus))
+
+    print(f"Corpus: {corpus.shape[0]:,} x {corpus.shape[1]}, {len(queries)} queries, k={k}, "
+          f"metric={args.metric}, storage={args.storage}")
+    truth = build_index(corpus, "flat", metric=args.metric).search(queries, k)[1]
+
+    results = []
+    print(f"{'index':<10}{'size MB':>9}{'build s':>9}{'recall@k':>10}{'QPS':>11}{'p50 ms':>9}{'p99 ms':>9}")
+    for index_type in args.types:
+        started = time.perf_counter()
+        index = build_index(corpus, index_type, metric=args.metric, storage=args.storage,
+                            nprobe=args.nprobe, ef_search=args.ef_search)
+        build_seconds = time.perf_counter() - started
+
+        stats = bench(index, queries, k)
+        row = {
+            "index_type": index_type,
+            "size_mb": round(len(faiss.serialize_index(index)) / 1e6, 3),
+            "build_seconds": round(build_seconds, 3),
+            "recall_at_k": round(recall_at_k(truth, stats.pop("found")), 4),
+            **{key: round(value, 3) for key, value in stats.items()},
+        }
+        results.append(row)
+        print(f"{index_type:<10}{row['size_mb']:>9.2f}{row['build_seconds']:>9.2f}{row['recall_at_k']:>10.3f}"
+              f"{row['qps']:>11,.0f}{row['p50_ms']:>9.3f}{row['p99_ms']:>9.3f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"n": int(corpus.shape[0]), "dim": int(corpus.shape[1]), "k": k, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
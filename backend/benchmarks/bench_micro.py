@@ -0,0 +1,138 @@
+"""
+Micro-benchmarks for the hot paths of both backends on synthetic corpora
+
+Times SimpleKrishnaRAG.chunk_text, get_embeddings, index.search and
+extract_verses, the shared detect_emotion, and the GitaDatabase lookups
+(reference, chapter, theme, BM25 search). Embeddings come from the local
+fake OpenAI server (benchmarks/fake_openai.py) or, with --encoder local,
+from the locally cached MiniLM model on whichever backend KRISHNA_ENCODER
+selects (torch, onnx or onnx-int8), so nothing leaves the machine.
+Results are compared with benchmarks/baselines/micro.json.
+
+    python benchmarks/bench_micro.py --verses 700
+    python benchmarks/bench_micro.py --verses 5000 --save-baseline
+    KRISHNA_ENCODER=onnx-int8 python benchmarks/bench_micro.py --encoder local --fail-on-regression
+"""
+
+import os
+import sys
+import json
+import tempfile
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND / "app"))
+sys.path.insert(0, str(BACKEND))
+
+# The benchmark builds its own components; never initialize the app at import
+os.environ["KRISHNA_EAGER_INIT"] = "0"
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+import openai
+from main import SimpleKrishnaRAG
+from chunking import VerseChunker, approximate_tokens
+from database import GitaDatabase
+from encoders import encoder_from_env
+from emotion_detector import detect_emotion
+from index_factory import build_index, index_config_from_env, prepare_vectors
+
+from fake_openai import FakeOpenAI, fake_embedding
+from harness import add_baseline_arguments, finish, flatten, make_report, time_calls
+from synthetic import gita_text, questions, verse_records
+
+
+def make_rag(args, fake: FakeOpenAI) -> SimpleKrishnaRAG:
+    """A SimpleKrishnaRAG with just the parts the benchmarked methods use"""
+    rag = SimpleKrishnaRAG()
+    rag.chunker = VerseChunker(chunk_tokens=args.chunk_tokens, overlap_tokens=args.chunk_overlap,
+                               count_tokens=approximate_tokens)
+    if args.encoder == "local":
+        rag.model = encoder_from_env()
+        rag.use_openai = False
+    else:
+        rag.client = openai.OpenAI(api_key="sk-fake-benchmark", base_url=fake.url)
+        rag.use_openai = True
+    return rag
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark the RAG hot paths")
+    parser.add_argument("--verses", type=int, default=700, help="Synthetic corpus size in verses")
+    parser.add_argument("--queries", type=int, default=500, help="Synthetic questions")
+    parser.add_argument("--encoder", choices=["fake", "local"], default="fake")
+    parser.add_argument("--batch", type=int, default=32, help="Texts per get_embeddings call")
+    parser.add_argument("--dim", type=int, default=384, help="Vector dimension for the index benchmark")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--chunk-tokens", type=int, default=254)
+    parser.add_argument("--chunk-overlap", type=int, default=32)
+    parser.add_argument("--min-seconds", type=float, default=1.0, help="Minimum run time per benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    text = gita_text(args.verses, args.seed)
+    queries = questions(args.queries, args.seed)
+    results = {}
+
+    with FakeOpenAI(dimensions=args.dim, seed=args.seed) as fake:
+        rag = make_rag(args, fake)
+
+        results["chunk_text"] = time_calls(rag.chunk_text, [text], unit="ms", min_seconds=args.min_seconds)
+        chunks = rag.chunk_text(text)
+        results["chunk_text"]["chunks"] = len(chunks)
+
+        batches = [chunks[i:i + args.batch] for i in range(0, max(len(chunks), 1), args.batch)] or [[text]]
+        results["get_embeddings"] = time_calls(rag.get_embeddings, batches, unit="ms",
+                                               min_seconds=args.min_seconds)
+        results["get_embeddings"]["texts_per_s"] = round(
+            results["get_embeddings"]["calls_per_s"] * sum(map(len, batches)) / len(batches), 1
+        )
+
+        # The index benchmark uses the fake vectors directly, so its cost is FAISS alone
+        corpus = np.stack([fake_embedding(chunk, args.dim) for chunk in chunks])
+        config = index_config_from_env()
+        index = build_index(corpus, **config)
+        query_vectors = [
+            prepare_vectors(fake_embedding(query, args.dim).reshape(1, -1), config["metric"])
+            for query in queries
+        ]
+        results["index_search"] = time_calls(lambda q: index.search(q, args.k), query_vectors,
+                                             min_seconds=args.min_seconds)
+
+        answers = [f"{query} As I said in Chapter {1 + i % 18}, Verse {1 + i % 47}. {chunks[i % len(chunks)]}"
+                   for i, query in enumerate(queries)]
+        results["extract_verses"] = time_calls(rag.extract_verses, answers, min_seconds=args.min_seconds)
+        results["detect_emotion"] = time_calls(detect_emotion, queries, min_seconds=args.min_seconds)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = Path(tmp) / "bhagavad_gita.json"
+        with open(data_path, 'w', encoding='utf-8') as f:
+            json.dump(verse_records(args.verses, args.seed), f, ensure_ascii=False)
+        db = GitaDatabase(str(data_path))
+        references = [(verse.chapter, verse.verse_number) for verse in db.get_all_verses()]
+        results["db_by_reference"] = time_calls(lambda ref: db.get_verse_by_reference(*ref), references,
+                                                min_seconds=args.min_seconds)
+        results["db_by_chapter"] = time_calls(db.get_verses_by_chapter, list(range(1, 19)),
+                                              min_seconds=args.min_seconds)
+        results["db_by_theme"] = time_calls(db.get_verses_by_theme, ["duty", "Self", "peace", "medit"],
+                                            min_seconds=args.min_seconds)
+        results["db_search"] = time_calls(db.search_verses, queries, min_seconds=args.min_seconds)
+
+    print(f"{args.verses:,} verses, {len(chunks):,} chunks, {len(queries):,} queries, encoder={args.encoder}")
+    print(f"{'benchmark':<18}{'p50':>12}{'p95':>12}{'p99':>12}{'calls/s':>12}")
+    for name, row in results.items():
+        unit = "ms" if "p50_ms" in row else "us"
+        print(f"{name:<18}{row[f'p50_{unit}']:>10.2f}{unit}{row[f'p95_{unit}']:>10.2f}{unit}"
+              f"{row[f'p99_{unit}']:>10.2f}{unit}{row['calls_per_s']:>12,.0f}")
+
+    config = {key: value for key, value in vars(args).items()
+              if key not in ("json", "baseline", "save_baseline", "tolerance", "fail_on_regression", "min_seconds")}
+    config["index"] = index_config_from_env()
+    sys.exit(finish(make_report("micro", config, flatten(results)), args))
+
+
+if __name__ == "__main__":
+    main()
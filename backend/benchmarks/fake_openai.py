@@ -0,0 +1,245 @@
+"""
+Local stand-in for the OpenAI API, so benchmarks and load tests run offline
+
+Serves POST /v1/embeddings and POST /v1/chat/completions (plain and
+streamed) in the response shapes the openai client parses. Embeddings
+are deterministic per input text (hashed word features, unit length), so
+similar texts get similar vectors and repeated runs retrieve the same
+chunks. Every request waits a configurable latency (plus jitter) and
+fails with a configurable probability and status, e.g. 429s with a
+Retry-After header to exercise the retry paths.
+
+    python benchmarks/fake_openai.py --port 8900 --latency-ms 300 --error-rate 0.02
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=fake uvicorn main:app
+"""
+
+import re
+import json
+import time
+import base64
+import random
+import hashlib
+import argparse
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+import numpy as np
+
+WORD = re.compile(r"\w+", re.UNICODE)
+ANSWER = (
+    "Dear soul, as I told Arjuna in Chapter 2, Verse 47, you have the right to perform your "
+    "duty but not to the fruits of action. Act with devotion and detachment, and peace will "
+    "follow. Remember also Chapter 6, Verse 5: lift yourself by your own self. May this "
+    "wisdom guide your path."
+)
+
+
+@lru_cache(maxsize=65536)
+def _word_vector(word: str, dimensions: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), "little")
+    return np.random.default_rng(seed).standard_normal(dimensions).astype('float32')
+
+
+def fake_embedding(text: str, dimensions: int) -> np.ndarray:
+    """Sum of per-word pseudo-random vectors, normalized; shared words mean closer vectors"""
+    vector = np.zeros(dimensions, dtype='float32')
+    for word in WORD.findall(text.lower()) or [""]:
+        vector += _word_vector(word, dimensions)
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+
+class FakeOpenAI:
+    """Threaded HTTP server emulating the two OpenAI endpoints the backends call"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        dimensions: int = 1536,
+        completion_tokens_per_s: float = 0.0,
+        seed: int = 0,
+    ):
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.dimensions = dimensions
+        # >0 spreads streamed tokens over time like a real model; 0 streams at once
+        self.token_delay = 1.0 / completion_tokens_per_s if completion_tokens_per_s > 0 else 0.0
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAI":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "FakeOpenAI":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _delay_and_fail(self) -> bool:
+        """Sleep the configured latency; True if this request should fail"""
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+            fail = self.rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        time.sleep(delay)
+        return fail
+
+    def embeddings(self, body: dict) -> dict:
+        inputs = body.get("input", [])
+        texts: List[str] = [inputs] if isinstance(inputs, str) else list(inputs)
+        dimensions = int(body.get("dimensions") or self.dimensions)
+        tokens = sum(len(WORD.findall(text)) for text in texts)
+        # Newer openai clients ask for base64-packed float32 by default
+        as_base64 = body.get("encoding_format") == "base64"
+        data = []
+        for i, text in enumerate(texts):
+            vector = fake_embedding(text, dimensions)
+            encoded = base64.b64encode(vector.tobytes()).decode('ascii') if as_base64 else vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": encoded})
+        return {
+            "object": "list",
+            "model": body.get("model", "text-embedding-3-small"),
+            "data": data,
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def completion(self, body: dict) -> dict:
+        prompt = " ".join(str(message.get("content", "")) for message in body.get("messages", []))
+        prompt_tokens, completion_tokens = len(WORD.findall(prompt)), len(ANSWER.split())
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-3.5-turbo"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": ANSWER},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def stream_chunks(self, body: dict):
+        base = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": body.get("model", "gpt-3.5-turbo")}
+        for i, word in enumerate(ANSWER.split(" ")):
+            delta = {"role": "assistant", "content": word} if i == 0 else {"content": " " + word}
+            yield {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+        yield {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    return self._send_json(400, {"error": {"message": "Invalid JSON", "type": "invalid_request_error"}})
+
+                path = self.path.split("?", 1)[0].rstrip("/")
+                if not path.endswith(("/embeddings", "/chat/completions")):
+                    return self._send_json(404, {"error": {"message": f"Unknown path {path}", "type": "not_found"}})
+
+                if fake._delay_and_fail():
+                    headers = {"Retry-After": "0.1"} if fake.error_status == 429 else None
+                    return self._send_json(fake.error_status, {"error": {
+                        "message": "Injected failure", "type": "fake_error", "code": str(fake.error_status)
+                    }}, headers)
+
+                if path.endswith("/embeddings"):
+                    return self._send_json(200, fake.embeddings(body))
+                if not body.get("stream"):
+                    return self._send_json(200, fake.completion(body))
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for chunk in fake.stream_chunks(body):
+                    self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                    if fake.token_delay:
+                        time.sleep(fake.token_delay)
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+
+            def _write_chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake OpenAI API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter on the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected failures")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--tokens-per-s", type=float, default=0.0, help="Streaming speed (0 = instant)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    fake = FakeOpenAI(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate,
+                      args.error_status, args.dimensions, args.tokens_per_s, args.seed)
+    print(f"Fake OpenAI API on {fake.url} (Ctrl+C to stop)")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fake.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
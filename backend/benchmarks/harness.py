@@ -0,0 +1,174 @@
+"""
+Shared timing summaries and baseline files for the benchmarks
+
+Results are flat {metric: value} dicts. Metric names carry their direction:
+`*_per_s` is better higher; `*_ms`, `*_us` and `*error_rate` are better
+lower; anything else is informational and never flagged. A baseline is one
+results file saved under benchmarks/baselines/, with the commit and
+configuration it was measured on, so a later run can flag regressions.
+"""
+
+import json
+import time
+import platform
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+DEFAULT_TOLERANCE = 0.20
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def summarize(latencies: Iterable[float], unit: str = "ms") -> Dict[str, float]:
+    """p50/p95/p99/max of latencies given in seconds, in `unit` (ms or us)"""
+    scale = 1e3 if unit == "ms" else 1e6
+    values = sorted(latencies)
+    return {
+        f"p50_{unit}": round(percentile(values, 0.50) * scale, 3),
+        f"p95_{unit}": round(percentile(values, 0.95) * scale, 3),
+        f"p99_{unit}": round(percentile(values, 0.99) * scale, 3),
+        f"max_{unit}": round((values[-1] if values else 0.0) * scale, 3),
+    }
+
+
+def time_calls(func: Callable, inputs: List, unit: str = "us", min_seconds: float = 0.0) -> Dict[str, float]:
+    """Call func(x) for every input (cycling until min_seconds), timing each call"""
+    latencies = []
+    started = time.perf_counter()
+    while True:
+        for item in inputs:
+            call_started = time.perf_counter()
+            func(item)
+            latencies.append(time.perf_counter() - call_started)
+        if time.perf_counter() - started >= min_seconds:
+            break
+    elapsed = time.perf_counter() - started
+    return {
+        **summarize(latencies, unit),
+        "calls": len(latencies),
+        "calls_per_s": round(len(latencies) / elapsed, 1) if elapsed else float("inf"),
+    }
+
+
+def flatten(results: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    """{"chunk_text": {"p50_us": 3}} -> {"chunk_text.p50_us": 3}"""
+    return {f"{name}.{metric}": value for name, row in results.items() for metric, value in row.items()
+            if isinstance(value, (int, float))}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_report(benchmark: str, config: dict, metrics: Dict[str, float]) -> dict:
+    return {
+        "benchmark": benchmark,
+        "commit": git_commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": config,
+        "metrics": metrics,
+    }
+
+
+def baseline_path(benchmark: str, path: Optional[str] = None) -> Path:
+    return Path(path) if path else BASELINE_DIR / f"{benchmark}.json"
+
+
+def save_report(report: dict, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Saved {path}")
+
+
+def load_report(path: Path) -> Optional[dict]:
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def direction(metric: str) -> int:
+    """+1 if higher is better, -1 if lower is better, 0 if not compared"""
+    name = metric.rsplit(".", 1)[-1]
+    if name.endswith("_per_s"):
+        return 1
+    if name.endswith(("_ms", "_us")) or name.endswith("error_rate"):
+        return -1
+    return 0
+
+
+def compare(report: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> List[dict]:
+    """Metrics that got worse than the baseline by more than `tolerance` (a fraction)"""
+    regressions = []
+    for metric, value in report["metrics"].items():
+        old = baseline["metrics"].get(metric)
+        sign = direction(metric)
+        if old is None or sign == 0:
+            continue
+        if metric.endswith("error_rate"):
+            # Rates start at 0; compare absolute points rather than ratios
+            worse = value - old > tolerance / 10
+        elif old == 0:
+            continue
+        else:
+            change = (value - old) / abs(old)
+            worse = -sign * change > tolerance
+        if worse:
+            regressions.append({"metric": metric, "baseline": old, "current": value})
+    return regressions
+
+
+def check_baseline(report: dict, path: Path, tolerance: float = DEFAULT_TOLERANCE, save: bool = False) -> bool:
+    """Print the comparison with the baseline at `path`; True if nothing regressed"""
+    baseline = load_report(path)
+    ok = True
+    if baseline is None:
+        print(f"No baseline at {path}; run with --save-baseline to create one")
+    else:
+        if baseline.get("config") != report["config"]:
+            print(f"Baseline {path} was measured with a different configuration; comparison is indicative only")
+        regressions = compare(report, baseline, tolerance)
+        print(f"Compared with baseline {baseline.get('commit') or '?'} ({baseline.get('created')}), "
+              f"tolerance {tolerance:.0%}")
+        for row in regressions:
+            print(f"  REGRESSION {row['metric']}: {row['baseline']} -> {row['current']}")
+        if not regressions:
+            print("  No regressions")
+        ok = not regressions
+    if save:
+        save_report(report, path)
+    return ok
+
+
+def add_baseline_arguments(parser):
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Baseline file (default benchmarks/baselines/<benchmark>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative slowdown before a metric is flagged")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on regressions")
+
+
+def finish(report: dict, args) -> int:
+    """Write --json, compare with (and optionally save) the baseline; the process exit code"""
+    if args.json:
+        save_report(report, Path(args.json))
+    ok = check_baseline(report, baseline_path(report["benchmark"], args.baseline),
+                        args.tolerance, save=args.save_baseline)
+    return 1 if (args.fail_on_regression and not ok) else 0
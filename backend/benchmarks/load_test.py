@@ -0,0 +1,302 @@
+"""
+End-to-end load test of /ask and /study against a local fake OpenAI API
+
+Starts benchmarks/fake_openai.py in-process and one backend under uvicorn in
+a scratch directory holding a synthetic corpus, waits for /readyz, then
+drives the endpoints from --concurrency client threads and reports
+throughput, error rate and p50/p95/p99 latency per endpoint, plus the
+server's own stage percentiles from /health. A 200 that carries a canned
+fallback answer (krishna_fallbacks_total of a FAILED_FALLBACKS kind on
+/metrics) counts as an error too. Latency and failures are
+injected into the fake API only once the backend is ready, so startup
+indexing is not affected. Nothing leaves the machine.
+
+    python benchmarks/load_test.py --app simple --concurrency 16 --requests 500
+    python benchmarks/load_test.py --app structured --duration 60 --latency-ms 400 --error-rate 0.05
+    python benchmarks/load_test.py --error-status 429 --env KRISHNA_BATCH_WINDOW_MS=0 --save-baseline
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import re
+import http.client
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fake_openai import FakeOpenAI
+from harness import add_baseline_arguments, finish, flatten, make_report, summarize
+from synthetic import THEMES, questions, write_corpus
+
+BACKEND = Path(__file__).resolve().parent.parent
+# Both backends serve main:app, from different directories
+APPS = {"simple": BACKEND, "structured": BACKEND / "app"}
+# Fallback kinds that mean the caller got a canned answer instead of a real one
+FAILED_FALLBACKS = ("generation_error", "ask_error")
+FALLBACK_LINE = re.compile(r'^krishna_fallbacks_total\{kind="([^"]*)"\} (\S+)$', re.M)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def request(conn: http.client.HTTPConnection, method: str, path: str,
+            payload: Optional[dict] = None) -> Tuple[int, bytes]:
+    body = json.dumps(payload).encode('utf-8') if payload is not None else None
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+def start_backend(args, fake: FakeOpenAI, workdir: Path, port: int, log_path: Path) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": fake.url,
+        "OPENAI_API_KEY": "sk-fake-benchmark",
+        "KRISHNA_EAGER_INIT": "0",
+        "HF_HUB_OFFLINE": "1",
+        "PYTHONUNBUFFERED": "1",
+    }
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    command = [
+        sys.executable, "-m", "uvicorn", "main:app", "--app-dir", str(APPS[args.app]),
+        "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+        "--workers", str(args.workers),
+    ]
+    log = open(log_path, 'w', encoding='utf-8')
+    return subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_ready(process: subprocess.Popen, port: int, timeout: float, log_path: Path, workers: int = 1):
+    """Wait until /readyz answers 200 on enough consecutive probes
+
+    Each probe opens a new connection, which the kernel hands to any of the
+    uvicorn workers, so one 200 only proves that a single worker is ready.
+    """
+    needed = max(3, 2 * workers)
+    streak = 0
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Backend exited with {process.returncode}:\n{log_path.read_text()[-2000:]}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            status, body = request(conn, "GET", "/readyz")
+            conn.close()
+            if status == 200:
+                streak += 1
+                if streak >= needed:
+                    return
+                time.sleep(0.1)
+                continue
+            streak = 0
+            report = json.loads(body)
+            if report.get("failed"):
+                raise RuntimeError(f"Backend failed to start: {report['error']}")
+        except (OSError, ValueError):
+            streak = 0
+        time.sleep(0.5)
+    raise RuntimeError(f"Backend not ready after {timeout:.0f}s; see {log_path}")
+
+
+def workload(args) -> List[Tuple[str, str, dict]]:
+    """(endpoint, path, payload) for every request, in a seeded order"""
+    rng = random.Random(args.seed)
+    asks = questions(max(args.requests, 100), args.seed)
+    jobs = []
+    for i in range(max(args.requests, 100)):
+        endpoint = rng.choice(args.endpoints)
+        if endpoint == "ask":
+            payload = {"query": asks[i], "language": "english", "mode": rng.choice(args.modes)}
+        else:
+            choice = rng.randrange(3)
+            payload = (
+                {"chapter": rng.randint(1, 18)} if choice == 0 else
+                {"verse": f"{rng.randint(1, 18)}.{rng.randint(1, 40)}"} if choice == 1 else
+                {"theme": rng.choice(THEMES)}
+            )
+        jobs.append((endpoint, f"/{endpoint}", payload))
+    return jobs
+
+
+def run_load(args, port: int, jobs: List[Tuple[str, str, dict]]) -> Tuple[List[tuple], float]:
+    """Send jobs from args.concurrency threads until --requests are done or --duration passes"""
+    samples: List[tuple] = []
+    lock = threading.Lock()
+    counter = iter(range(10 ** 9))
+    deadline = time.monotonic() + args.duration if args.duration else None
+
+    def worker():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=args.timeout)
+        while True:
+            with lock:
+                n = next(counter)
+            if deadline is None and n >= args.requests:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            endpoint, path, payload = jobs[n % len(jobs)]
+            started = time.perf_counter()
+            try:
+                status, _ = request(conn, "POST", path, payload)
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=args.timeout)
+                status = 0
+            elapsed = time.perf_counter() - started
+            with lock:
+                samples.append((endpoint, status, elapsed))
+        conn.close()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(args.concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+def fallback_counts(port: int) -> Dict[str, float]:
+    """krishna_fallbacks_total by kind, from the backend's /metrics"""
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        _, body = request(conn, "GET", "/metrics")
+        conn.close()
+    except OSError:
+        return {}
+    return {kind: float(value) for kind, value in FALLBACK_LINE.findall(body.decode('utf-8'))}
+
+
+def summarize_samples(samples: List[tuple], seconds: float, fallback_errors: int = 0) -> Dict[str, Dict[str, float]]:
+    """Per-endpoint rows; fallback answers are only known server-wide, so they count in "all" alone"""
+    results = {}
+    for endpoint in ["all"] + sorted({sample[0] for sample in samples}):
+        rows = [sample for sample in samples if endpoint == "all" or sample[0] == endpoint]
+        errors = sum(1 for _, status, _ in rows if status != 200)
+        if endpoint == "all":
+            errors = min(len(rows), errors + fallback_errors)
+        results[endpoint] = {
+            "requests": len(rows),
+            "errors": errors,
+            "error_rate": round(errors / len(rows), 4) if rows else 0.0,
+            "requests_per_s": round(len(rows) / seconds, 2) if seconds else 0.0,
+            **summarize([latency for _, status, latency in rows if status == 200]),
+        }
+    return results
+
+
+def server_stages(port: int) -> Dict[str, Dict[str, float]]:
+    """Stage percentiles the backend measured itself (/health), in ms"""
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        _, body = request(conn, "GET", "/health")
+        conn.close()
+        health = json.loads(body)
+    except (OSError, ValueError):
+        return {}
+    stages = health.get("metrics", {}).get("krishna_stage_seconds", {})
+    fallbacks = health.get("metrics", {}).get("krishna_fallbacks_total", 0)
+    results = {
+        f"server_{stage}": {f"{name}_ms": round(value * 1000, 3) for name, value in row.items() if name != "count"}
+        for stage, row in stages.items()
+    }
+    results["server"] = {"fallbacks": fallbacks}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the backend against a fake OpenAI API")
+    parser.add_argument("--app", choices=sorted(APPS), default="simple")
+    parser.add_argument("--endpoints", nargs="+", choices=["ask", "study"], default=["ask", "study"])
+    parser.add_argument("--modes", nargs="+", default=["default", "emotion", "study"], help="/ask modes to mix")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Total requests (ignored with --duration)")
+    parser.add_argument("--duration", type=float, default=0.0, help="Run for this many seconds instead")
+    parser.add_argument("--warmup", type=int, default=10, help="Requests sent before measuring")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Client timeout per request")
+    parser.add_argument("--startup-timeout", type=float, default=600.0)
+    parser.add_argument("--verses", type=int, default=700, help="Synthetic corpus size")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Fake OpenAI latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake OpenAI calls that fail")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--tokens-per-s", type=float, default=0.0, help="Fake streaming speed")
+    parser.add_argument("--env", action="append", default=[], help="KEY=VALUE for the backend (repeatable)")
+    parser.add_argument("--workdir", help="Scratch directory (default: a temporary one, removed afterwards)")
+    parser.add_argument("--seed", type=int, default=0)
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="krishna-load-"))
+    write_corpus(workdir, args.verses, args.seed)
+    log_path = workdir / "backend.log"
+    port = free_port()
+    fake = FakeOpenAI(seed=args.seed, completion_tokens_per_s=args.tokens_per_s).start()
+    process = start_backend(args, fake, workdir, port, log_path)
+    try:
+        print(f"Starting {args.app} backend on :{port} (fake OpenAI at {fake.url}, workdir {workdir})")
+        started = time.perf_counter()
+        wait_ready(process, port, args.startup_timeout, log_path, args.workers)
+        startup_seconds = time.perf_counter() - started
+        print(f"Ready after {startup_seconds:.1f}s")
+
+        # Only now slow down and break the fake API
+        fake.latency, fake.jitter = args.latency_ms / 1000.0, args.jitter_ms / 1000.0
+        fake.error_rate, fake.error_status = args.error_rate, args.error_status
+
+        jobs = workload(args)
+        if args.warmup:
+            warmup = argparse.Namespace(**{**vars(args), "requests": args.warmup, "duration": 0.0})
+            run_load(warmup, port, jobs)
+        before = fallback_counts(port)
+        samples, seconds = run_load(args, port, jobs)
+        after = fallback_counts(port)
+        fallback_errors = int(sum(after.get(kind, 0) - before.get(kind, 0) for kind in FAILED_FALLBACKS))
+        results = summarize_samples(samples, seconds, fallback_errors)
+        results["all"]["fallback_errors"] = fallback_errors
+        results.update(server_stages(port))
+        results["fake_openai"] = {"calls": fake.requests, "injected_errors": fake.errors}
+        results["startup"] = {"seconds": round(startup_seconds, 2)}
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        fake.stop()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{len(samples):,} requests in {seconds:.1f}s at concurrency {args.concurrency}")
+    print(f"{'endpoint':<10}{'req/s':>9}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for endpoint in ["all", *args.endpoints]:
+        row = results.get(endpoint)
+        if row:
+            print(f"{endpoint:<10}{row['requests_per_s']:>9.1f}{row['errors']:>8}{row['p50_ms']:>10.1f}"
+                  f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}")
+    for name, row in results.items():
+        if name.startswith("server_"):
+            print(f"  {name[7:]:<16} p50 {row.get('p50_ms', 0):>8.2f} ms   p99 {row.get('p99_ms', 0):>8.2f} ms")
+
+    config = {key: value for key, value in vars(args).items()
+              if key not in ("json", "baseline", "save_baseline", "tolerance", "fail_on_regression", "workdir")}
+    sys.exit(finish(make_report(f"load_{args.app}", config, flatten(results)), args))
+
+
+if __name__ == "__main__":
+    main()
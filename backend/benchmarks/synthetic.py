@@ -0,0 +1,71 @@
+"""
+Seeded synthetic corpora for the benchmarks: Gita-style source text for the
+Simple RAG backend, verse JSON for the structured backend, and user questions
+"""
+
+import json
+import random
+from pathlib import Path
+from typing import List
+
+WORDS = ("dharma action duty self soul mind detachment devotion knowledge yoga Arjuna "
+         "Krishna peace desire wisdom senses work fruit surrender eternal").split()
+THEMES = ["duty", "action", "detachment", "devotion", "knowledge", "self", "mind", "peace",
+          "surrender", "meditation", "karma", "wisdom"]
+EMOTIONS = ["sadness", "anger", "fear", "confusion", "guilt", "stress", "doubt"]
+QUESTIONS = [
+    "I feel {e} about my {t}, what should I do?",
+    "How can I do my {t} without worrying about the results?",
+    "What does the Gita teach about {t}?",
+    "I am so stressed and anxious about my {t}",
+    "Why do I keep doubting myself when it comes to {t}?",
+    "How do I find peace when my {t} is falling apart?",
+]
+TOPICS = ["career", "family", "exams", "marriage", "health", "friends", "duty", "future"]
+
+
+def gita_text(verses: int, seed: int = 0) -> str:
+    """Verse headings followed by commentary paragraphs of varying length"""
+    rng = random.Random(seed)
+    paragraphs = []
+    for i in range(verses):
+        chapter, verse = 1 + (i // 40) % 18, 1 + i % 40
+        sentences = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 24))).capitalize() + "."
+            for _ in range(rng.randint(2, 14))
+        ]
+        paragraphs.append(f"Chapter {chapter}, Verse {verse}\n" + " ".join(sentences))
+    return "\n\n".join(paragraphs) + "\n"
+
+
+def verse_records(count: int, seed: int = 0) -> List[dict]:
+    """Rows in the data/bhagavad_gita.json format"""
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(12, 30))).capitalize() + "."
+        records.append({
+            "chapter": 1 + (i // 78) % 18,
+            "verse_number": 1 + i % 78,
+            "sanskrit": "धर्मक्षेत्रे कुरुक्षेत्रे समवेता युयुत्सवः",
+            "english": sentence,
+            "hindi": "कर्म करो, फल की चिंता मत करो।",
+            "themes": rng.sample(THEMES, rng.randint(1, 3)),
+            "emotions": rng.sample(EMOTIONS, rng.randint(0, 2)),
+        })
+    return records
+
+
+def questions(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [rng.choice(QUESTIONS).format(e=rng.choice(EMOTIONS), t=rng.choice(TOPICS)) for _ in range(count)]
+
+
+def write_corpus(workdir: Path, verses: int, seed: int = 0) -> Path:
+    """data/synthetic_gita.txt and data/bhagavad_gita.json under workdir (both backends' layouts)"""
+    data_dir = workdir / "data"
+    data_dir.mkdir(parents=True, exist_ok=True)
+    (data_dir / "synthetic_gita.txt").write_text(gita_text(verses, seed), encoding='utf-8')
+    with open(data_dir / "bhagavad_gita.json", 'w', encoding='utf-8') as f:
+        json.dump(verse_records(verses, seed), f, ensure_ascii=False)
+    return data_dir
@@ -0,0 +1,174 @@
+"""
+Export the local sentence-transformers model to ONNX (fp32 and int8) and check agreement
+
+Writes model.onnx, model_int8.onnx (dynamic int8 quantization of the
+weights), tokenizer.json and encoder.json into the output directory. Then
+it encodes sample texts with PyTorch and with both ONNX models and
+compares them. It records the cosine similarity of each ONNX vector to the
+PyTorch one, plus throughput, in encoder.json. A backend whose minimum
+cosine falls below --min-cosine is marked as failed, and the app will not
+load it. Serve the export with KRISHNA_ENCODER=onnx or onnx-int8.
+
+    python export_encoder.py [--output storage/onnx/all-MiniLM-L6-v2] [--data data/bhagavad_gita.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# app/ modules use flat imports, so put the package directory on the path
+sys.path.insert(0, str(Path(__file__).resolve().parent / "app"))
+
+from encoders import (
+    DEFAULT_ONNX_DIR, ENCODER_MANIFEST, LOCAL_MODEL, ONNX_FILES, OnnxEncoder, TorchEncoder, encoder_threads
+)
+
+SAMPLE_TEXTS = [
+    "I feel lost and anxious about my career, what should I do?",
+    "How can I perform my duty without attachment to the results?",
+    "You have the right to perform your actions, but not to the fruits of action.",
+    "Why am I so angry at my family all the time?",
+    "What does the Gita teach about meditation and controlling the mind?",
+    "Chapter 2, Verse 47 explains detachment from outcomes.",
+    "कर्मण्येवाधिकारस्ते मा फलेषु कदाचन",
+    "Peace",
+]
+
+
+def sample_texts(data_path: str, limit: int):
+    texts = list(SAMPLE_TEXTS)
+    if data_path and os.path.exists(data_path):
+        with open(data_path, 'r', encoding='utf-8') as f:
+            texts += [f"{verse['english']} {' '.join(verse.get('themes', []))}" for verse in json.load(f)]
+    return texts[:limit]
+
+
+def export_onnx(model, output: Path, opset: int) -> list:
+    """Export the transformer (without pooling) with dynamic batch and sequence axes"""
+    import torch
+
+    transformer = model[0].auto_model.eval()
+    dummy = model.tokenizer(["Dear soul, act without attachment."], return_tensors="pt", padding=True)
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+
+    class Wrapper(torch.nn.Module):
+        def __init__(self, module):
+            super().__init__()
+            self.module = module
+
+        def forward(self, *inputs):
+            return self.module(**dict(zip(input_names, inputs))).last_hidden_state
+
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in [*input_names, "last_hidden_state"]}
+    with torch.no_grad():
+        torch.onnx.export(
+            Wrapper(transformer), tuple(dummy[name] for name in input_names), str(output / ONNX_FILES["onnx"]),
+            input_names=input_names, output_names=["last_hidden_state"], dynamic_axes=dynamic_axes,
+            opset_version=opset, do_constant_folding=True
+        )
+    return input_names
+
+
+def throughput(encode, texts, repeat: int = 3) -> float:
+    encode(texts[:8])  # warm up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        encode(texts)
+    seconds = time.perf_counter() - started
+    return round(repeat * len(texts) / seconds, 1) if seconds else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the local encoder to ONNX and verify it")
+    parser.add_argument("--model", default=LOCAL_MODEL, help="sentence-transformers model name")
+    parser.add_argument("--output", default=os.getenv("KRISHNA_ENCODER_DIR", DEFAULT_ONNX_DIR))
+    parser.add_argument("--data", default="data/bhagavad_gita.json", help="Verse JSON used as sample texts")
+    parser.add_argument("--samples", type=int, default=512, help="Texts used for the agreement check")
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="Lowest acceptable cosine vs PyTorch")
+    parser.add_argument("--opset", type=int, default=14)
+    parser.add_argument("--skip-export", action="store_true", help="Only re-run the agreement check")
+    args = parser.parse_args()
+
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+    reference = TorchEncoder(args.model)
+    model = reference.model
+
+    if not args.skip_export:
+        modules = [type(module).__name__ for module in model]
+        pooling = model[1].get_pooling_mode_str() if len(model) > 1 else None
+        if pooling != "mean":
+            print(f"❌ {args.model} uses {pooling} pooling; only mean pooling is supported")
+            sys.exit(1)
+
+        print(f"Exporting {args.model} to {output}...")
+        input_names = export_onnx(model, output, args.opset)
+        model.tokenizer.save_pretrained(str(output))
+        if not (output / "tokenizer.json").exists():
+            print("❌ The model has no fast tokenizer (tokenizer.json); it cannot be served without PyTorch")
+            sys.exit(1)
+
+        print("Quantizing weights to int8...")
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(output / ONNX_FILES["onnx"]), str(output / ONNX_FILES["onnx-int8"]),
+                         weight_type=QuantType.QInt8)
+
+        manifest = {
+            "model": args.model,
+            "dimension": reference.dimension,
+            "max_seq_length": model.max_seq_length,
+            "pad_id": model.tokenizer.pad_token_id or 0,
+            "pooling": "mean",
+            "normalize": "Normalize" in modules,
+            "inputs": input_names,
+            "opset": args.opset,
+            "files": ONNX_FILES,
+        }
+    else:
+        with open(output / ENCODER_MANIFEST, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    manifest.pop("agreement", None)
+    with open(output / ENCODER_MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    texts = sample_texts(args.data, args.samples)
+    print(f"Checking agreement on {len(texts)} texts ({encoder_threads()} threads)...")
+    expected = reference.encode(texts)
+    expected /= np.maximum(np.linalg.norm(expected, axis=1, keepdims=True), 1e-12)
+    agreement = {"torch": {"texts_per_s": throughput(reference.encode, texts)}}
+    ok = True
+    for backend in ("onnx", "onnx-int8"):
+        encoder = OnnxEncoder(str(output), quantized=backend == "onnx-int8")
+        vectors = encoder.encode(texts)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        cosines = (vectors * expected).sum(axis=1)
+        passed = bool(cosines.min() >= args.min_cosine)
+        ok = ok and passed
+        agreement[backend] = {
+            "ok": passed,
+            "min_cosine": round(float(cosines.min()), 6),
+            "mean_cosine": round(float(cosines.mean()), 6),
+            "texts_per_s": throughput(encoder.encode, texts),
+            "file_mb": round((output / ONNX_FILES[backend]).stat().st_size / 1e6, 1),
+        }
+
+    manifest["agreement"] = {"min_cosine": args.min_cosine, "samples": len(texts), **agreement}
+    with open(output / ENCODER_MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"{'backend':<11}{'min cos':>10}{'mean cos':>10}{'texts/s':>10}{'MB':>8}")
+    for backend, row in agreement.items():
+        print(f"{backend:<11}{row.get('min_cosine', 1.0):>10.4f}{row.get('mean_cosine', 1.0):>10.4f}"
+              f"{row['texts_per_s']:>10,.0f}{row.get('file_mb', 0):>8}")
+    if not ok:
+        print(f"❌ Agreement below {args.min_cosine}; the failing backend will not be loaded")
+        sys.exit(1)
+    print(f"✅ Export verified. Serve it with KRISHNA_ENCODER=onnx-int8 (or onnx) KRISHNA_ENCODER_DIR={output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Gunicorn settings for Ask Krishna
+
+The app is imported once in the master (preload_app) so the index, chunk
+store and embedding model are built or loaded a single time and shared
+copy-on-write by every forked worker. Set KRISHNA_SHARED_INDEX=1 so the
+snapshot files are memory-mapped read-only as well.
+
+With preload the master builds the index at import (KRISHNA_EAGER_INIT=1);
+without it each worker starts listening first and loads in the background,
+reporting progress on /readyz.
+
+Each worker's intra-op thread pools (local encoder, faiss, BLAS) are sized
+to cores / workers so that together they do not oversubscribe the CPU.
+"""
+
+import os
+
+# app/ modules use flat imports (from models import ...)
+pythonpath = "app"
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+# Set before the app (and torch/onnxruntime/faiss) is imported
+threads_per_worker = str(max(1, (os.cpu_count() or 1) // workers))
+for variable in ("KRISHNA_ENCODER_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+    os.environ.setdefault(variable, threads_per_worker)
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "1").lower() in ("1", "true", "yes")
+if preload_app:
+    # Background init would run per worker after the fork, defeating preload
+    os.environ.setdefault("KRISHNA_EAGER_INIT", "1")
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+
+def when_ready(server):
+    if preload_app:
+        server.log.info("Index preloaded in master; workers will share it copy-on-write")
+
+
+def post_fork(server, worker):
+    # torch's thread pool is per process; re-limit it in each worker
+    from encoders import configure_worker_threads
+    threads = configure_worker_threads()
+    server.log.info(f"Worker {worker.pid} forked (shared index: {os.getenv('KRISHNA_SHARED_INDEX', 'off')}, "
+                    f"{threads} encoder threads)")
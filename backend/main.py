@@ -1,21 +1,50 @@
 import os
+import sys
+import time
+import asyncio
+import secrets
+import threading
 import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-import PyPDF2
 import json
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, AsyncIterator
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 # Simple imports - avoiding LlamaIndex issues
 import openai
-from sentence_transformers import SentenceTransformer
 import numpy as np
-import faiss
+
+# Shared helpers live alongside the structured implementation in app/
+sys.path.append(str(Path(__file__).resolve().parent / "app"))
+from snapshot import CorpusSnapshot, hash_sources, source_digests
+from batching import QueryBatcher
+from query_cache import QueryCache
+from answer_cache import SemanticAnswerCache
+from ingestion import discover_sources, ingest
+from chunking import VERSE_PATTERNS, VerseChunker, make_token_counter
+from emotion_detector import simple_detector
+from bulk_embed import bulk_embedder_from_env, check_compatible
+from index_factory import (
+    add_vectors, build_index, build_signature, index_config_from_env, prepare_vectors, remove_ids,
+    set_search_params, truncate_embeddings
+)
+from lazy import lazy_import
+from startup import StartupProgress
+from encoders import LOCAL_MODEL, encoder_from_env
+import metrics
+from metrics import FALLBACKS, instrument_app, record_openai_error, record_usage, timed
+
+# faiss (and torch, see encoders.py) are only imported by the code paths
+# that use them, so the worker can answer liveness probes right away
+faiss = lazy_import("faiss")
 
 # Load environment variables
 load_dotenv(override=True)
@@ -40,6 +69,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-stage latency histograms and counters on GET /metrics (Prometheus format);
+# KRISHNA_TIMING_HEADER=1 adds a Server-Timing stage breakdown to each response
+instrument_app(app, timing_header=os.getenv("KRISHNA_TIMING_HEADER", "").lower() in ("1", "true", "yes"))
+
 # Pydantic models
 class ChatRequest(BaseModel):
     query: str
@@ -65,33 +98,170 @@ class StudyResponse(BaseModel):
     query_type: str
     timestamp: str
 
+# Simple fallback without OpenAI
+OFFLINE_RESPONSE = """Dear soul, based on the wisdom of the Bhagavad Gita, I offer this guidance:
+
+The sacred texts teach us that in times of stress, we must remember our dharma and act without attachment to results. As I taught Arjuna, perform your duties with dedication but do not be bound by the outcomes.
+
+When work becomes a source of suffering, examine whether you are acting from ego or from duty. True peace comes when we align our actions with our higher purpose.
+
+May divine wisdom guide your path, beloved seeker. Remember that all challenges are opportunities for spiritual growth."""
+
+INGEST_VERSION = 3
+STARTUP_STAGES = ("embedding_model", "sources", "snapshot", "incremental_update", "ingest", "embedding", "index")
+
+ERROR_RESPONSE = "Dear soul, I am having difficulty accessing the divine wisdom at this moment. Please try again, and remember that the answers you seek often lie within your own heart, guided by dharma."
+
 class SimpleKrishnaRAG:
-    def __init__(self):
+    def __init__(self, progress: Optional[StartupProgress] = None):
+        self.progress = progress or StartupProgress(STARTUP_STAGES)
         self.chunks = []
+        self.chunk_metadata = []  # per-chunk provenance: source file and page range
         self.embeddings = None
         self.index = None
         self.model = None
-        self.setup_system()
+        self.embedding_model_id = None
+        # Chunks are sized in embedding-model tokens and start at verse boundaries;
+        # 254 plus the [CLS]/[SEP] tokens fits MiniLM's 256-token input
+        self.chunk_tokens = int(os.getenv("KRISHNA_CHUNK_TOKENS", "254"))
+        self.chunk_overlap = int(os.getenv("KRISHNA_CHUNK_OVERLAP", "32"))
+        self.chunker = None
+        self.chunking_id = None
+        self.bulk_embedder = None
+        # Id-mapped so documents can be added and removed without a rebuild
+        self.index_config = {**index_config_from_env(), "id_map": True}
+        self.tombstones = set()
+        self.source_digests: Dict[str, str] = {}
+        self.update_lock = threading.Lock()
+        self.last_update: Optional[Dict[str, Any]] = None
+        # Optional prefix truncation of OpenAI embeddings (e.g. 1536 -> 256 dims)
+        self.embedding_dimensions = int(os.getenv("KRISHNA_EMBEDDING_DIMENSIONS", "0")) or None
+        # Shared mode maps chunks/embeddings read-only so forked workers share one copy
+        self.shared_index = os.getenv("KRISHNA_SHARED_INDEX", "").lower() in ("1", "true", "yes")
+        self.snapshot = CorpusSnapshot(
+            os.getenv("KRISHNA_SNAPSHOT_DIR", "storage/snapshot"),
+            mmap=self.shared_index
+        )
+        # Blocking work (local encode, FAISS search) runs on a bounded pool,
+        # and each stage has its own concurrency limit so one can't starve the rest
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("KRISHNA_CPU_THREADS", "4")),
+            thread_name_prefix="krishna-rag"
+        )
+        self.embed_limit = asyncio.Semaphore(int(os.getenv("KRISHNA_EMBED_CONCURRENCY", "4")))
+        self.search_limit = asyncio.Semaphore(int(os.getenv("KRISHNA_SEARCH_CONCURRENCY", "4")))
+        self.llm_limit = asyncio.Semaphore(int(os.getenv("KRISHNA_LLM_CONCURRENCY", "16")))
+        self.async_client = None
+        self.bulk_client = None
+        # Concurrent /ask queries are coalesced into one encode + search (0 disables)
+        batch_window_ms = float(os.getenv("KRISHNA_BATCH_WINDOW_MS", "5"))
+        self.batcher = QueryBatcher(
+            self.aget_embeddings,
+            self.asearch_batch,
+            window_ms=batch_window_ms,
+            max_batch=int(os.getenv("KRISHNA_BATCH_MAX", "32"))
+        ) if batch_window_ms > 0 else None
+        self.query_cache = QueryCache(
+            max_size=int(os.getenv("KRISHNA_QUERY_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("KRISHNA_QUERY_CACHE_TTL", "3600"))
+        )
+        # Optional: reuse generated answers for paraphrased questions
+        self.answer_cache = SemanticAnswerCache(
+            threshold=float(os.getenv("KRISHNA_ANSWER_CACHE_THRESHOLD", "0.95")),
+            max_entries=int(os.getenv("KRISHNA_ANSWER_CACHE_SIZE", "512"))
+            if os.getenv("KRISHNA_ANSWER_CACHE", "").lower() in ("1", "true", "yes") else 0,
+            disabled_modes=os.getenv("KRISHNA_ANSWER_CACHE_DISABLED_MODES", "").split(",")
+        )
     
     def setup_system(self):
-        """Initialize the simple RAG system"""
+        """Initialize the simple RAG system, reporting each stage to self.progress"""
         try:
             print("🕉️ Initializing Krishna AI Advisor...")
             
             # Setup embedding model
-            api_key = os.getenv("OPENAI_API_KEY")
-            if api_key:
-                print("🔑 Using OpenAI embeddings")
-                self.client = openai.OpenAI(api_key=api_key)
-                self.use_openai = True
+            with self.progress.stage("embedding_model"):
+                api_key = os.getenv("OPENAI_API_KEY")
+                if api_key:
+                    print("🔑 Using OpenAI embeddings")
+                    self.client = openai.OpenAI(api_key=api_key)
+                    # BulkEmbedder does its own Retry-After backoff; no SDK retries underneath it
+                    self.bulk_client = self.client.with_options(max_retries=0)
+                    self.async_client = openai.AsyncOpenAI(api_key=api_key)
+                    self.use_openai = True
+                    self.embedding_model_id = "text-embedding-3-small"
+                    if self.embedding_dimensions:
+                        self.embedding_model_id += f"@{self.embedding_dimensions}"
+                else:
+                    print("🔑 Using local sentence transformers (free)")
+                    # PyTorch, or the ONNX export when KRISHNA_ENCODER=onnx|onnx-int8
+                    self.model = encoder_from_env(LOCAL_MODEL)
+                    self.use_openai = False
+                    self.embedding_model_id = LOCAL_MODEL
+                    # Longer chunks would be silently truncated by the encoder
+                    self.chunk_tokens = min(self.chunk_tokens, self.model.max_seq_length - 2)
+                
+                count_tokens = make_token_counter(self.model, self.embedding_model_id)
+                self.chunker = VerseChunker(
+                    chunk_tokens=self.chunk_tokens,
+                    overlap_tokens=self.chunk_overlap,
+                    count_tokens=count_tokens
+                )
+                self.chunking_id = f"{self.chunker.signature};tokenizer={self.embedding_model_id};ingest={INGEST_VERSION}"
+                # Index builds go through token-bounded, concurrent, checkpointed batches
+                self.bulk_embedder = bulk_embedder_from_env(
+                    lambda texts: self.get_embeddings(texts, client=self.bulk_client),
+                    self.embedding_model_id, count_tokens, remote=self.use_openai
+                )
+                self.bulk_embedder.on_progress = lambda done, total: self.progress.update(
+                    "embedding", batches_done=done, batches_total=total
+                )
+            
+            with self.progress.stage("sources"):
+                sources = self.find_source_pdfs()
+                digests = source_digests(sources)
+                source_hash = hash_sources(sources, extra=self.chunking_id, digests=digests)
+            
+            # Reuse the on-disk snapshot when the sources and model are unchanged
+            with self.progress.stage("snapshot"):
+                fresh = self.snapshot.load(source_hash, self.embedding_model_id)
+                stale = not fresh and (
+                    self.snapshot.load(None, self.embedding_model_id)
+                    and self.snapshot.manifest.get("chunking") == self.chunking_id
+                    and self.snapshot.manifest.get("index") == build_signature(self.index_config)
+                )
+                if fresh or stale:
+                    self.use_snapshot()
+            
+            if fresh:
+                print(f"⚡ Loaded snapshot with {self.live_chunk_count()} chunks")
+                if self.snapshot.manifest.get("index") != build_signature(self.index_config):
+                    # Index type changed: rebuild from stored embeddings, no re-embedding
+                    with self.progress.stage("index"):
+                        print(f"🔄 Rebuilding {self.index_config['index_type']} index from snapshot embeddings")
+                        self.rebuild_index()
+                        self.save_snapshot(source_hash)
+            elif stale:
+                # Sources changed since the snapshot: embed only new/changed documents
+                with self.progress.stage("incremental_update"):
+                    summary = self.last_update = self.update_corpus(sources)
+                print(f"🔁 Incremental update: +{len(summary['added'])} / -{len(summary['removed'])} documents")
             else:
-                print("🔑 Using local sentence transformers (free)")
-                self.model = SentenceTransformer('all-MiniLM-L6-v2')
-                self.use_openai = False
+                # Process PDF and create index
+                with self.progress.stage("ingest"):
+                    self.process_pdf()
+                with self.progress.stage("embedding"):
+                    embeddings = self.bulk_embedder.embed(self.chunks)
+                with self.progress.stage("index"):
+                    self.create_index(embeddings)
+                    self.source_digests = digests
+                    if self.save_snapshot(source_hash) and self.shared_index and \
+                            self.snapshot.load(source_hash, self.embedding_model_id):
+                        # Swap the private build copies for the shared mapped ones
+                        self.use_snapshot()
             
-            # Process PDF and create index
-            self.process_pdf()
-            self.create_index()
+            # Cached retrievals are only valid for this exact index
+            self.query_cache.set_version(f"{source_hash[:16]}:{self.embedding_model_id}")
+            self.answer_cache.set_version(self.query_cache.version)
             
             print("✅ Krishna AI ready to serve divine wisdom!")
             
@@ -100,92 +270,209 @@ class SimpleKrishnaRAG:
             logger.error(f"Setup error: {e}")
             raise
     
-    def process_pdf(self):
-        """Extract and chunk text from PDF"""
+    def use_snapshot(self):
+        """Serve the chunks, embeddings and index held by self.snapshot"""
+        self.chunks = self.snapshot.chunks
+        self.chunk_metadata = self.snapshot.chunk_metadata
+        self.embeddings = self.snapshot.embeddings
+        self.index = self.snapshot.index
+        self.tombstones = set(self.snapshot.manifest.get("tombstones", []))
+        self.source_digests = self.snapshot.manifest.get("sources", {})
+        set_search_params(self.index, self.index_config["nprobe"], self.index_config["ef_search"])
+    
+    def save_snapshot(self, source_hash: str) -> bool:
         try:
-            # Check for PDF
-            data_path = Path("data")
-            if not data_path.exists():
-                data_path.mkdir()
-                raise FileNotFoundError("📁 Please create a 'data' folder and add your bhagavad_gita.pdf")
-            
-            pdf_files = list(data_path.glob("*.pdf"))
-            if not pdf_files:
-                raise FileNotFoundError("📄 No PDF found in data/ folder")
+            self.snapshot.save(
+                list(self.chunks), np.asarray(self.embeddings), self.index, source_hash,
+                self.embedding_model_id, build_signature(self.index_config), self.chunk_metadata,
+                extra={
+                    "chunking": self.chunking_id,
+                    "sources": self.source_digests,
+                    "tombstones": sorted(int(i) for i in self.tombstones),
+                }
+            )
+            print(f"💾 Snapshot saved to {self.snapshot.directory}")
+            return True
+        except OSError as e:
+            logger.warning(f"Could not write snapshot: {e}")
+            return False
+    
+    def is_live(self, idx) -> bool:
+        """True for ids that map to a chunk that has not been removed"""
+        return 0 <= idx < len(self.chunks) and idx not in self.tombstones and bool(self.chunks[idx])
+    
+    def live_chunk_count(self) -> int:
+        return self.index.ntotal - len(self.tombstones) if self.index is not None else 0
+    
+    def rebuild_index(self):
+        """Re-index the live (non-removed) chunks from their stored embeddings"""
+        live = np.array([i for i, chunk in enumerate(self.chunks) if chunk], dtype='int64')
+        self.index = build_index(np.asarray(self.embeddings)[live], ids=live, **self.index_config)
+        self.tombstones = set()
+    
+    def update_corpus(self, sources: Optional[List[Path]] = None) -> Dict[str, Any]:
+        """Embed only new or changed source documents and swap in the updated index
+
+        Chunk ids are positions in self.chunks and never reused: removed
+        chunks become empty strings and their vectors are deleted from the
+        id-mapped index (or tombstoned where the index cannot delete), so
+        searches in flight against the previous index still resolve.
+        """
+        with self.update_lock:
+            sources = sources if sources is not None else self.find_source_pdfs()
+            digests = source_digests(sources)
+            known = self.source_digests
+            added = [p for p in sources if known.get(p.name) != digests[p.name]]
+            removed = sorted(name for name in known if digests.get(name) != known[name])
             
-            pdf_path = pdf_files[0]
-            print(f"📖 Processing: {pdf_path.name}")
+            if added or removed:
+                chunks = list(self.chunks)
+                metadata = list(self.chunk_metadata)
+                stale_ids = [i for i, meta in enumerate(metadata) if chunks[i] and meta.get("source") in removed]
+                for i in stale_ids:
+                    chunks[i] = ""
+                
+                # Work on a copy so requests keep searching the serving index meanwhile
+                index = faiss.clone_index(self.index)
+                tombstones = set(self.tombstones)
+                if not remove_ids(index, stale_ids):
+                    tombstones.update(stale_ids)
+                
+                embeddings = np.asarray(self.embeddings)
+                new_chunks = list(ingest(added, chunker=self.chunker.chunk)) if added else []
+                if new_chunks:
+                    texts = [chunk.text for chunk in new_chunks]
+                    vectors = self.bulk_embedder.embed(texts)
+                    check_compatible(index, vectors, self.snapshot.manifest.get("embedding_model"),
+                                     self.embedding_model_id)
+                    ids = np.arange(len(chunks), len(chunks) + len(texts))
+                    add_vectors(index, vectors, ids, self.index_config["metric"])
+                    embeddings = np.vstack([embeddings, vectors])
+                    chunks += texts
+                    metadata += [chunk.metadata for chunk in new_chunks]
+                set_search_params(index, self.index_config["nprobe"], self.index_config["ef_search"])
+                
+                # Swap everything in one step
+                self.chunks, self.chunk_metadata, self.embeddings = chunks, metadata, embeddings
+                self.index, self.tombstones, self.source_digests = index, tombstones, digests
+                
+                source_hash = hash_sources(sources, extra=self.chunking_id, digests=digests)
+                self.save_snapshot(source_hash)
+                self.query_cache.set_version(f"{source_hash[:16]}:{self.embedding_model_id}")
+                self.answer_cache.set_version(self.query_cache.version)
             
-            # Extract text from PDF
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
+            return {
+                "added": [p.name for p in added],
+                "removed": removed,
+                "chunks": self.live_chunk_count(),
+                "tombstones": len(self.tombstones),
+            }
+    
+    def find_source_pdfs(self) -> List[Path]:
+        """Locate every source document (PDF or text) the index is built from"""
+        data_path = Path("data")
+        if not data_path.exists():
+            data_path.mkdir()
+            raise FileNotFoundError("📁 Please create a 'data' folder and add your bhagavad_gita.pdf")
+        
+        sources = discover_sources(str(data_path))
+        if not sources:
+            raise FileNotFoundError("📄 No PDF or .txt source found in data/ folder")
+        
+        return sources
+    
+    def process_pdf(self):
+        """Extract and chunk text from all source documents"""
+        try:
+            sources = self.find_source_pdfs()
+            print(f"📖 Processing: {', '.join(p.name for p in sources)}")
             
-            print(f"📊 Extracted {len(text):,} characters")
+            # Pages are extracted in a process pool and streamed into the chunker
+            chunks = list(ingest(sources, chunker=self.chunker.chunk))
+            self.chunks = [chunk.text for chunk in chunks]
+            self.chunk_metadata = [chunk.metadata for chunk in chunks]
             
-            # Simple chunking - split by paragraphs and sentences
-            self.chunks = self.chunk_text(text)
             print(f"📝 Created {len(self.chunks)} text chunks")
             
         except Exception as e:
             print(f"❌ PDF processing error: {e}")
             raise
     
-    def chunk_text(self, text: str, chunk_size: int = 1000) -> List[str]:
-        """Simple text chunking"""
-        # Split by double newlines first (paragraphs)
-        paragraphs = text.split('\n\n')
-        chunks = []
-        current_chunk = ""
+    def chunk_text(self, text: str, chunk_size: Optional[int] = None) -> List[str]:
+        """Chunk a standalone text with the same verse-aware chunker as ingestion
+
+        `chunk_size` overrides the chunk size in tokens (default self.chunk_tokens).
+        """
+        chunker = self.chunker
+        if chunk_size is not None and chunk_size != chunker.chunk_tokens:
+            chunker = VerseChunker(chunk_tokens=chunk_size, overlap_tokens=self.chunk_overlap,
+                                   count_tokens=chunker.count_tokens)
+        paragraphs = ((para, "text", 1, 1) for para in text.split('\n\n'))
+        return [chunk.text for chunk in chunker.chunk(paragraphs)]
+    
+    def get_embeddings(self, texts: List[str], client=None) -> np.ndarray:
+        """Get embeddings for texts with the configured model (on `client`, default self.client)
         
-        for para in paragraphs:
-            if len(current_chunk) + len(para) < chunk_size:
-                current_chunk += para + "\n\n"
+        Errors propagate: a local-model fallback would produce vectors from a
+        different space (and dimension) than the index was built with.
+        """
+        with timed("embed"):
+            if self.use_openai:
+                try:
+                    response = (client or self.client).embeddings.create(
+                        input=texts,
+                        model="text-embedding-3-small"
+                    )
+                except Exception as e:
+                    record_openai_error("embeddings", e)
+                    raise
+                record_usage("embeddings", response)
+                return truncate_embeddings(
+                    np.array([item.embedding for item in response.data]), self.embedding_dimensions
+                )
             else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = para + "\n\n"
-        
-        if current_chunk:
-            chunks.append(current_chunk.strip())
-        
-        # Filter out very short chunks
-        chunks = [chunk for chunk in chunks if len(chunk) > 100]
-        return chunks
+                return self.model.encode(texts)
+    
+    async def run_blocking(self, limit: asyncio.Semaphore, func, *args):
+        """Run a blocking call on the worker pool under a stage concurrency limit"""
+        async with limit:
+            loop = asyncio.get_running_loop()
+            return await metrics.run_in_executor(loop, self.executor, func, *args)
     
-    def get_embeddings(self, texts: List[str]) -> np.ndarray:
-        """Get embeddings for texts"""
-        if self.use_openai:
-            try:
-                response = self.client.embeddings.create(
-                    input=texts,
-                    model="text-embedding-3-small"
+    async def aget_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Async get_embeddings: remote calls on AsyncOpenAI, local encode off the loop"""
+        with timed("embed"):
+            if self.use_openai:
+                async with self.embed_limit:
+                    try:
+                        response = await self.async_client.embeddings.create(
+                            input=texts,
+                            model="text-embedding-3-small"
+                        )
+                    except Exception as e:
+                        record_openai_error("embeddings", e)
+                        raise
+                record_usage("embeddings", response)
+                return truncate_embeddings(
+                    np.array([item.embedding for item in response.data]), self.embedding_dimensions
                 )
-                return np.array([item.embedding for item in response.data])
-            except Exception as e:
-                print(f"OpenAI embedding error: {e}, falling back to local")
-                if not self.model:
-                    self.model = SentenceTransformer('all-MiniLM-L6-v2')
-                return self.model.encode(texts)
-        else:
-            return self.model.encode(texts)
+            else:
+                return await self.run_blocking(self.embed_limit, self.model.encode, texts)
     
-    def create_index(self):
+    def create_index(self, embeddings: Optional[np.ndarray] = None):
         """Create FAISS index for similarity search"""
         try:
             print("🔄 Creating search index...")
             
-            # Generate embeddings
-            embeddings = self.get_embeddings(self.chunks)
+            # Generate embeddings in token-bounded batches (resumable, see bulk_embed.py)
+            if embeddings is None:
+                embeddings = self.bulk_embedder.embed(self.chunks)
             
             # Create FAISS index
-            dimension = embeddings.shape[1]
-            self.index = faiss.IndexFlatL2(dimension)
-            self.index.add(embeddings.astype('float32'))
+            self.embeddings = embeddings.astype('float32')
+            self.index = build_index(self.embeddings, **self.index_config)
             
-            print(f"✅ Index created with {len(self.chunks)} chunks")
+            print(f"✅ {self.index_config['index_type']} index created with {len(self.chunks)} chunks")
             
         except Exception as e:
             print(f"❌ Index creation error: {e}")
@@ -195,104 +482,225 @@ class SimpleKrishnaRAG:
         """Find most similar text chunks"""
         try:
             query_embedding = self.get_embeddings([query])
-            distances, indices = self.index.search(query_embedding.astype('float32'), k)
+            with timed("search"):
+                distances, indices = self.index.search(
+                    prepare_vectors(query_embedding, self.index_config["metric"]), k + len(self.tombstones)
+                )
             
             results = []
             for idx in indices[0]:
-                if idx < len(self.chunks):
+                if self.is_live(idx):
                     results.append(self.chunks[idx])
             
-            return results
+            return results[:k]
             
         except Exception as e:
             print(f"Search error: {e}")
+            FALLBACKS.inc(kind="search_error")
             return []
     
-    def generate_krishna_response(self, query: str, context_chunks: List[str], mode: str = "default") -> str:
-        """Generate Krishna-style response"""
+    async def aretrieve(self, query: str, k: int = 3):
+        """Embed and search one query, returning (embedding, top-k indices); cached"""
+        cache_key = self.query_cache.make_key(query, k)
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        # Over-fetch past tombstoned ids the index could not delete
+        fetch_k = k + len(self.tombstones)
+        if self.batcher:
+            query_embedding, distances, indices = await self.batcher.search(query, fetch_k)
+        else:
+            query_embedding = (await self.aget_embeddings([query])).astype('float32')
+            distances, indices = await self.asearch_batch(query_embedding, fetch_k)
+            query_embedding, indices = query_embedding[0], indices[0]
+        
+        result = (query_embedding, [int(idx) for idx in indices if self.is_live(idx)][:k])
+        self.query_cache.put(cache_key, result)
+        return result
+    
+    async def asearch_similar_chunks(self, query: str, k: int = 3) -> List[str]:
+        """Async search_similar_chunks that never blocks the event loop"""
+        _, chunks = await self.aretrieve_chunks(query, k)
+        return chunks
+    
+    async def aretrieve_chunks(self, query: str, k: int = 3):
+        """Like asearch_similar_chunks, but also returns the query embedding (None on error)"""
         try:
-            # Combine context
-            context = "\n\n".join(context_chunks[:2])  # Use top 2 chunks
+            with timed("retrieve"):
+                query_embedding, indices = await self.aretrieve(query, k)
+            return query_embedding, [self.chunks[idx] for idx in indices if self.is_live(idx)]
             
-            # Create Krishna persona prompt
-            if mode == "emotion":
-                persona = "You are Lord Krishna, providing compassionate spiritual guidance to someone in emotional distress."
-            elif mode == "study":
-                persona = "You are Lord Krishna, teaching the profound wisdom of the Bhagavad Gita."
-            else:
-                persona = "You are Lord Krishna, offering divine wisdom and guidance from the Bhagavad Gita."
-            
-            prompt = f"""
-            {persona}
+        except Exception as e:
+            print(f"Search error: {e}")
+            FALLBACKS.inc(kind="search_error")
+            return None, []
+    
+    async def asearch_batch(self, query_embeddings: np.ndarray, k: int):
+        """One FAISS search over a stacked matrix of query embeddings"""
+        query_embeddings = prepare_vectors(query_embeddings, self.index_config["metric"])
+        with timed("search"):
+            return await self.run_blocking(self.search_limit, self.index.search, query_embeddings, k)
+    
+    def build_prompt(self, query: str, context_chunks: List[str], mode: str = "default") -> str:
+        """Build the Krishna persona prompt for the LLM"""
+        # Combine context
+        context = "\n\n".join(context_chunks[:2])  # Use top 2 chunks
+        
+        # Create Krishna persona prompt
+        if mode == "emotion":
+            persona = "You are Lord Krishna, providing compassionate spiritual guidance to someone in emotional distress."
+        elif mode == "study":
+            persona = "You are Lord Krishna, teaching the profound wisdom of the Bhagavad Gita."
+        else:
+            persona = "You are Lord Krishna, offering divine wisdom and guidance from the Bhagavad Gita."
+        
+        return f"""
+        {persona}
 
-            Guidelines:
-            1. Speak as Krishna would - with wisdom, compassion, and divine authority
-            2. Reference specific chapters/verses when you can identify them
-            3. Apply ancient wisdom to modern situations
-            4. Be encouraging and spiritually uplifting
-            5. Address the seeker respectfully (Dear soul, Beloved devotee, O seeker)
-            6. End with a blessing or encouragement
+        Guidelines:
+        1. Speak as Krishna would - with wisdom, compassion, and divine authority
+        2. Reference specific chapters/verses when you can identify them
+        3. Apply ancient wisdom to modern situations
+        4. Be encouraging and spiritually uplifting
+        5. Address the seeker respectfully (Dear soul, Beloved devotee, O seeker)
+        6. End with a blessing or encouragement
 
-            Context from Bhagavad Gita:
-            {context}
+        Context from Bhagavad Gita:
+        {context}
 
-            Seeker's question: {query}
+        Seeker's question: {query}
 
-            Krishna's response:
-            """
+        Krishna's response:
+        """
+    
+    def generate_krishna_response(self, query: str, context_chunks: List[str], mode: str = "default") -> str:
+        """Generate Krishna-style response"""
+        try:
+            prompt = self.build_prompt(query, context_chunks, mode)
             
             if self.use_openai:
                 # Use OpenAI for response generation
-                response = self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[{"role": "user", "content": prompt}],
-                    max_tokens=500,
-                    temperature=0.7
-                )
+                with timed("generate"):
+                    response = self.client.chat.completions.create(
+                        model="gpt-3.5-turbo",
+                        messages=[{"role": "user", "content": prompt}],
+                        max_tokens=500,
+                        temperature=0.7
+                    )
+                record_usage("chat", response)
                 return response.choices[0].message.content
             else:
-                # Simple fallback without OpenAI
-                return f"""Dear soul, based on the wisdom of the Bhagavad Gita, I offer this guidance:
-
-The sacred texts teach us that in times of stress, we must remember our dharma and act without attachment to results. As I taught Arjuna, perform your duties with dedication but do not be bound by the outcomes.
-
-When work becomes a source of suffering, examine whether you are acting from ego or from duty. True peace comes when we align our actions with our higher purpose.
-
-May divine wisdom guide your path, beloved seeker. Remember that all challenges are opportunities for spiritual growth."""
+                FALLBACKS.inc(kind="offline")
+                return OFFLINE_RESPONSE
                 
         except Exception as e:
             print(f"Response generation error: {e}")
-            return "Dear soul, I am having difficulty accessing the divine wisdom at this moment. Please try again, and remember that the answers you seek often lie within your own heart, guided by dharma."
+            record_openai_error("chat", e)
+            FALLBACKS.inc(kind="generation_error")
+            return ERROR_RESPONSE
     
-    def detect_emotion(self, text: str) -> Optional[str]:
-        """Simple emotion detection"""
-        emotions = {
-            "sadness": ["sad", "depressed", "sorrow", "grief", "crying", "lost"],
-            "anger": ["angry", "mad", "furious", "rage", "frustrated"],
-            "fear": ["afraid", "scared", "worry", "anxious", "panic"],
-            "confusion": ["confused", "lost", "unclear", "don't understand"],
-            "stress": ["stressed", "overwhelmed", "pressure", "exhausted"]
-        }
+    async def agenerate_krishna_response(self, query: str, context_chunks: List[str], mode: str = "default") -> str:
+        """Async generate_krishna_response using AsyncOpenAI"""
+        try:
+            prompt = self.build_prompt(query, context_chunks, mode)
+            
+            if self.use_openai:
+                with timed("generate"):
+                    async with self.llm_limit:
+                        response = await self.async_client.chat.completions.create(
+                            model="gpt-3.5-turbo",
+                            messages=[{"role": "user", "content": prompt}],
+                            max_tokens=500,
+                            temperature=0.7
+                        )
+                record_usage("chat", response)
+                return response.choices[0].message.content
+            else:
+                FALLBACKS.inc(kind="offline")
+                return OFFLINE_RESPONSE
+                
+        except Exception as e:
+            print(f"Response generation error: {e}")
+            record_openai_error("chat", e)
+            FALLBACKS.inc(kind="generation_error")
+            return ERROR_RESPONSE
+    
+    async def astream_krishna_response(self, query: str, context_chunks: List[str], mode: str = "default") -> AsyncIterator[str]:
+        """Yield the Krishna response piece by piece as the LLM produces tokens"""
+        produced = False
+        try:
+            prompt = self.build_prompt(query, context_chunks, mode)
+            
+            if self.use_openai:
+                started = time.perf_counter()
+                with timed("generate"):
+                    async with self.llm_limit:
+                        stream = await self.async_client.chat.completions.create(
+                            model="gpt-3.5-turbo",
+                            messages=[{"role": "user", "content": prompt}],
+                            max_tokens=500,
+                            temperature=0.7,
+                            stream=True
+                        )
+                        async for chunk in stream:
+                            if not chunk.choices:
+                                continue
+                            delta = chunk.choices[0].delta.content
+                            if delta:
+                                if not produced:
+                                    metrics.record_stage("first_token", time.perf_counter() - started)
+                                produced = True
+                                yield delta
+            else:
+                produced = True
+                FALLBACKS.inc(kind="offline")
+                yield OFFLINE_RESPONSE
+                
+        except Exception as e:
+            print(f"Response generation error: {e}")
+            record_openai_error("chat", e)
+            if produced:
+                # Part of the answer is already out; let the caller report it as truncated
+                raise
+            FALLBACKS.inc(kind="generation_error")
+            yield ERROR_RESPONSE
+    
+    async def agenerate_cached(self, query_embedding, mode: str, language: str, generate, key: str = ""):
+        """Serve a paraphrased question from the answer cache, else await generate() and store it
+
+        `generate` returns (response, verses_referenced); `key` must match
+        exactly as well as the embedding being close (see SemanticAnswerCache).
+        """
+        if query_embedding is not None:
+            cached = self.answer_cache.lookup(query_embedding, mode, language, key)
+            if cached is not None:
+                return cached["response"], cached["verses"]
         
-        text_lower = text.lower()
-        for emotion, keywords in emotions.items():
-            if any(keyword in text_lower for keyword in keywords):
-                return emotion
-        return None
+        started = time.perf_counter()
+        response, verses_referenced = await generate()
+        if query_embedding is not None and response != ERROR_RESPONSE:
+            self.answer_cache.store(
+                query_embedding, mode, language, response, verses_referenced,
+                time.perf_counter() - started, key
+            )
+        return response, verses_referenced
+    
+    def detect_emotion(self, text: str) -> Optional[str]:
+        """Emotion detection with the shared matcher, over this backend's own emotion set"""
+        return simple_detector.detect(text)
     
     def extract_verses(self, text: str) -> List[str]:
         """Extract verse references from text - improved version"""
+        with timed("extract_verses"):
+            return self._extract_verses(text)
+    
+    def _extract_verses(self, text: str) -> List[str]:
         import re
         verses = []
         
-        # More specific patterns to avoid false matches
-        patterns = [
-            r'Chapter\s+(\d{1,2}),?\s+Verse\s+(\d{1,2})\b',  # "Chapter X, Verse Y"
-            r'Gita\s+(\d{1,2})\.(\d{1,2})\b',                # "Gita X.Y"
-            r'BG\s+(\d{1,2})\.(\d{1,2})\b'                   # "BG X.Y"
-        ]
-        
-        for pattern in patterns:
+        # More specific patterns to avoid false matches (shared with the chunker)
+        for pattern in VERSE_PATTERNS:
             matches = re.findall(pattern, text)
             for match in matches:
                 chapter, verse = int(match[0]), int(match[1])
@@ -306,12 +714,50 @@ May divine wisdom guide your path, beloved seeker. Remember that all challenges
         
         return list(set(verses))[:3]  # Limit to 3 references
 
-# Initialize the RAG system
-try:
-    krishna_rag = SimpleKrishnaRAG()
-except Exception as e:
-    print(f"Failed to initialize Krishna RAG: {e}")
-    krishna_rag = None
+# The RAG system is built after the server starts listening, so liveness
+# probes pass at once and /readyz reports how far startup has got.
+# KRISHNA_EAGER_INIT=1 builds it at import instead (gunicorn preload_app,
+# where the master must hold the index before forking the workers).
+krishna_rag = None
+startup = StartupProgress(STARTUP_STAGES)
+
+def initialize_rag() -> Optional[SimpleKrishnaRAG]:
+    """Build the RAG system, publishing it to the endpoints only once it is complete"""
+    global krishna_rag
+    if not startup.begin():
+        return krishna_rag
+    for _ in startup.attempts():
+        try:
+            rag = SimpleKrishnaRAG(progress=startup)
+            rag.setup_system()
+            krishna_rag = rag
+            startup.finish()
+            break
+        except Exception as e:
+            print(f"Failed to initialize Krishna RAG: {e}")
+            startup.fail(e)
+    return krishna_rag
+
+def cache_lookups() -> Dict[tuple, int]:
+    counts = {}
+    if krishna_rag:
+        for name, cache in (("query", krishna_rag.query_cache), ("answer", krishna_rag.answer_cache)):
+            counts[(name, "hit")], counts[(name, "miss")] = cache.hits, cache.misses
+    return counts
+
+metrics.registry.callback_counter(
+    "krishna_cache_lookups_total", "Query and answer cache lookups", ("cache", "result"), cache_lookups
+)
+
+# Spawned ingestion workers re-import this module; only the parent process initializes
+if os.getenv("KRISHNA_EAGER_INIT", "").lower() in ("1", "true", "yes") \
+        and multiprocessing.parent_process() is None:
+    initialize_rag()
+
+@app.on_event("startup")
+async def start_background_init():
+    if not startup.begun:
+        threading.Thread(target=initialize_rag, name="krishna-init", daemon=True).start()
 
 @app.get("/")
 async def root():
@@ -321,38 +767,81 @@ async def root():
         "status": "Divine wisdom is ready" if krishna_rag else "Initializing..."
     }
 
+@app.get("/livez")
+async def liveness():
+    """The process is up and serving requests, even while the index is still loading
+
+    503 once initialization has failed for good, so the process is restarted.
+    """
+    if startup.failed:
+        return JSONResponse(status_code=503, content={"status": "failed", "error": startup.error})
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+@app.get("/readyz")
+async def readiness():
+    """200 once the RAG system can answer, else 503 with per-stage startup progress"""
+    report = startup.report()
+    if not krishna_rag:
+        return JSONResponse(status_code=503, content=report)
+    return report
+
 @app.get("/health")
 async def health_check():
     return {
-        "status": "healthy" if krishna_rag else "initializing",
-        "chunks_loaded": len(krishna_rag.chunks) if krishna_rag else 0,
+        "status": "healthy" if krishna_rag else ("failed" if startup.failed else "initializing"),
+        "chunks_loaded": krishna_rag.live_chunk_count() if krishna_rag else 0,
+        "query_cache": krishna_rag.query_cache.stats() if krishna_rag else None,
+        "answer_cache": krishna_rag.answer_cache.stats() if krishna_rag else None,
+        "startup": startup.report(),
+        "metrics": metrics.registry.snapshot(),
         "timestamp": datetime.now().isoformat()
     }
 
+@app.post("/admin/reindex")
+async def reindex(x_admin_token: Optional[str] = Header(None)):
+    """Pick up added, changed or removed documents in data/ without a full rebuild
+
+    Only this worker swaps its index; other gunicorn workers load the updated
+    snapshot on their next start (e.g. after `kill -HUP` on the master).
+    """
+    admin_token = os.getenv("KRISHNA_ADMIN_TOKEN")
+    if not admin_token or not secrets.compare_digest((x_admin_token or "").encode(), admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    if not krishna_rag:
+        raise HTTPException(status_code=503, detail="Krishna is still initializing")
+    
+    loop = asyncio.get_running_loop()
+    summary = await loop.run_in_executor(None, krishna_rag.update_corpus)
+    return {**summary, "timestamp": datetime.now().isoformat()}
+
 @app.post("/ask", response_model=ChatResponse)
 async def ask_krishna(request: ChatRequest):
     """Ask Krishna for guidance"""
+    if not krishna_rag:
+        raise HTTPException(status_code=503, detail="Krishna is still initializing")
+    
     try:
-        if not krishna_rag:
-            raise HTTPException(status_code=503, detail="Krishna is still initializing")
-            
         # Find relevant context
-        context_chunks = krishna_rag.search_similar_chunks(request.query)
+        query_embedding, context_chunks = await krishna_rag.aretrieve_chunks(request.query)
         
         # Detect emotion if in emotion mode
         detected_emotion = None
         if request.mode == "emotion":
             detected_emotion = krishna_rag.detect_emotion(request.query)
         
-        # Generate response
-        response = krishna_rag.generate_krishna_response(
-            request.query, 
-            context_chunks, 
-            request.mode
-        )
+        async def generate():
+            response = await krishna_rag.agenerate_krishna_response(
+                request.query, 
+                context_chunks, 
+                request.mode
+            )
+            # Extract verse references
+            return response, krishna_rag.extract_verses(response + " ".join(context_chunks))
         
-        # Extract verse references
-        verses_referenced = krishna_rag.extract_verses(response + " ".join(context_chunks))
+        # Generate response (or reuse the answer to a near-identical question)
+        response, verses_referenced = await krishna_rag.agenerate_cached(
+            query_embedding, request.mode, request.language, generate
+        )
         
         return ChatResponse(
             krishna_response=response,
@@ -364,6 +853,7 @@ async def ask_krishna(request: ChatRequest):
         
     except Exception as e:
         logger.error(f"Error in ask_krishna: {e}")
+        FALLBACKS.inc(kind="ask_error")
         # Return graceful fallback
         return ChatResponse(
             krishna_response="Dear soul, I am having some difficulty at the moment. Please try again, and remember that the divine guidance you seek is always within your heart.",
@@ -373,13 +863,87 @@ async def ask_krishna(request: ChatRequest):
             detected_emotion=None
         )
 
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/ask/stream")
+async def ask_krishna_stream(request: ChatRequest):
+    """Ask Krishna for guidance, streamed as server-sent events
+
+    Events: `meta` (detected emotion and verse candidates from retrieval),
+    `token` (response text as it is generated), `done` (final verse
+    references, same fields as /ask) or `error` (`truncated` is true when
+    the LLM stream broke off after some tokens were sent).
+    """
+    if not krishna_rag:
+        raise HTTPException(status_code=503, detail="Krishna is still initializing")
+    
+    async def events():
+        parts = []
+        try:
+            query_embedding, context_chunks = await krishna_rag.aretrieve_chunks(request.query)
+            
+            detected_emotion = None
+            if request.mode == "emotion":
+                detected_emotion = krishna_rag.detect_emotion(request.query)
+            
+            yield sse_event("meta", {
+                "query": request.query,
+                "detected_emotion": detected_emotion,
+                "verse_candidates": krishna_rag.extract_verses(" ".join(context_chunks)),
+                "timestamp": datetime.now().isoformat()
+            })
+            
+            cached = None
+            if query_embedding is not None:
+                cached = krishna_rag.answer_cache.lookup(query_embedding, request.mode, request.language)
+            
+            if cached is not None:
+                response = cached["response"]
+                verses_referenced = cached["verses"]
+                yield sse_event("token", {"text": response})
+            else:
+                started = time.perf_counter()
+                async for piece in krishna_rag.astream_krishna_response(request.query, context_chunks, request.mode):
+                    parts.append(piece)
+                    yield sse_event("token", {"text": piece})
+                response = "".join(parts)
+                verses_referenced = krishna_rag.extract_verses(response + " ".join(context_chunks))
+                if query_embedding is not None and response != ERROR_RESPONSE:
+                    krishna_rag.answer_cache.store(
+                        query_embedding, request.mode, request.language, response, verses_referenced,
+                        time.perf_counter() - started
+                    )
+            
+            yield sse_event("done", {
+                "verses_referenced": verses_referenced,
+                "detected_emotion": detected_emotion,
+                "timestamp": datetime.now().isoformat(),
+                "query": request.query
+            })
+            
+        except Exception as e:
+            logger.error(f"Error in ask_krishna_stream: {e}")
+            # Nothing is cached: a stream that broke off is not an answer
+            yield sse_event("error", {
+                "detail": "Dear soul, I am having some difficulty at the moment. Please try again.",
+                "truncated": bool(parts)
+            })
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/study", response_model=StudyResponse)
 async def study_mode(request: StudyRequest):
     """Study Gita topics"""
+    if not krishna_rag:
+        raise HTTPException(status_code=503, detail="Krishna is still initializing")
+    
     try:
-        if not krishna_rag:
-            raise HTTPException(status_code=503, detail="Krishna is still initializing")
-            
         # Build study query
         if request.chapter:
             study_query = f"Chapter {request.chapter} Bhagavad Gita teachings"
@@ -394,13 +958,19 @@ async def study_mode(request: StudyRequest):
             raise HTTPException(status_code=400, detail="Please specify chapter, verse, or theme")
         
         # Get relevant context
-        context_chunks = krishna_rag.search_similar_chunks(study_query)
+        query_embedding, context_chunks = await krishna_rag.aretrieve_chunks(study_query)
         
-        # Generate study response
-        response = krishna_rag.generate_krishna_response(study_query, context_chunks, "study")
+        async def generate():
+            # Generate study response
+            response = await krishna_rag.agenerate_krishna_response(study_query, context_chunks, "study")
+            # Extract verses
+            return response, krishna_rag.extract_verses(response)
         
-        # Extract verses
-        verses_referenced = krishna_rag.extract_verses(response)
+        # Study queries are templates that differ only by chapter, verse or
+        # theme, so the exact query_type is part of the cache key
+        response, verses_referenced = await krishna_rag.agenerate_cached(
+            query_embedding, "study", request.language, generate, key=query_type
+        )
         
         return StudyResponse(
             answer=response,
@@ -1,34 +1,61 @@
 """
-Script to pre-generate embeddings and save FAISS index
-Run this after setting up your data to improve startup time
+Build command that pre-generates the embedding bundle used by app/main.py
+Run this after setting up your data so workers load the bundle instead of re-embedding
+
+    python setup_embeddings.py [--data data/bhagavad_gita.json] [--output storage/gita_bundle]
 """
 
 import os
-from app.database import GitaDatabase
-from app.embeddings import EmbeddingManager
+import sys
+import argparse
+from pathlib import Path
+
+# app/ modules use flat imports, so put the package directory on the path
+sys.path.insert(0, str(Path(__file__).resolve().parent / "app"))
+
+from database import GitaDatabase
+from embeddings import EmbeddingManager
 
 def main():
+    parser = argparse.ArgumentParser(description="Build the Ask Krishna embedding bundle")
+    parser.add_argument("--data", default="data/bhagavad_gita.json", help="Verse JSON file")
+    parser.add_argument("--output", default=os.getenv("EMBEDDING_BUNDLE_DIR", "storage/gita_bundle"),
+                        help="Bundle output directory")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the bundle is up to date")
+    args = parser.parse_args()
+
     print("Loading Bhagavad Gita data...")
-    db = GitaDatabase()
+    db = GitaDatabase(args.data)
     verses = db.get_all_verses()
-    
+
     if not verses:
-        print("No verses found! Make sure data/bhagavad_gita.json exists.")
-        return
-    
+        print(f"No verses found! Make sure {args.data} exists.")
+        sys.exit(1)
+
     print(f"Found {len(verses)} verses")
     print("Initializing embedding manager...")
-    
+
     embedding_manager = EmbeddingManager(use_openai=bool(os.getenv("OPENAI_API_KEY")))
-    
-    print("Generating embeddings...")
-    verses_data = [verse.dict() for verse in verses]
-    embedding_manager.add_verses(verses_data)
-    
-    print("Saving FAISS index...")
-    embedding_manager.save_index("gita_embeddings.index")
-    
-    print("Setup complete! Embeddings saved to gita_embeddings.index")
+    checksum = db.checksum()
+
+    if not args.force and embedding_manager.load_bundle(args.output, checksum):
+        print(f"Bundle in {args.output} is up to date ({embedding_manager.model_name})")
+        return
+
+    if not args.force and embedding_manager.load_bundle(args.output):
+        # Only embed verses that were added or changed since the last build
+        print("Updating existing bundle...")
+        summary = embedding_manager.update_verses(verses)
+        print(f"Embedded {summary['added']} new/changed verses, dropped {summary['removed']}")
+    else:
+        print("Generating embeddings...")
+        embedding_manager.add_verses(verses)
+
+    print("Saving embedding bundle...")
+    embedding_manager.save_bundle(args.output, checksum)
+
+    print(f"Setup complete! Bundle saved to {args.output} "
+          f"({embedding_manager.model_name}, dim {embedding_manager.index.d}, {len(verses)} verses)")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,29 @@
+"""
+Incrementally update the Simple RAG snapshot after adding, changing or
+removing documents in data/
+
+Only new or changed documents are embedded; removed ones are dropped from
+the index. Running workers pick up the new snapshot on restart
+(`kill -HUP <gunicorn master>`), or call POST /admin/reindex on a worker.
+
+    python update_index.py
+"""
+
+import sys
+
+from main import initialize_rag
+
+def main():
+    krishna_rag = initialize_rag()
+    if not krishna_rag:
+        print("❌ Krishna RAG failed to initialize, see the errors above")
+        sys.exit(1)
+
+    # Startup already applies pending changes to a stale snapshot; report those
+    summary = krishna_rag.last_update or krishna_rag.update_corpus()
+    print(f"Added/changed: {', '.join(summary['added']) or 'none'}")
+    print(f"Removed/replaced: {', '.join(summary['removed']) or 'none'}")
+    print(f"Serving {summary['chunks']} chunks ({summary['tombstones']} tombstoned)")
+
+if __name__ == "__main__":
+    main()